@@ -1,6 +1,7 @@
 from junior.cli_manager import CLIManager
 from junior.utils.setup import Setup
-import sys, signal, os, time
+from junior.utils import tracing
+import sys, signal, os, time, json, atexit
 click = CLIManager()
 #from .utils.brain import Brain
 #from rich import print
@@ -22,23 +23,80 @@ def signal_handler(sig, frame):
 
 signal.signal(signal.SIGINT, signal_handler)
 
+def show_stats(as_json=False, output_dir=""):
+    """Report per model latency and throughput percentiles (or export them as JSON)."""
+    from junior.utils.telemetry import Telemetry
+    report = Telemetry().report()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "telemetry.json"), "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+    if as_json:
+        print(json.dumps(report, indent=4))
+        return
+    if not report:
+        click.echo("No telemetry recorded yet.")
+        return
+    def fmt(value):
+        return "-" if value is None else f"{value:.0f}"
+    rows = []
+    for model, stats in report.items():
+        rows.append([
+            model, stats["requests"],
+            fmt(stats["ttft_ms"]["p50"]), fmt(stats["latency_ms"]["p50"]), fmt(stats["latency_ms"]["p90"]), fmt(stats["latency_ms"]["p99"]),
+            fmt(stats["tokens_per_second"]["p50"]), stats["validation_failures"], stats["retries"], stats["errors"],
+            f"{stats['hedge_wins']}/{stats['hedges']}", stats["hedge_wasted_tokens"],
+            f"{stats['cache_read_tokens']}/{stats['cache_read_tokens'] + stats['cache_miss_tokens']}"
+        ])
+    click.table("LLM telemetry", ["Model", "Requests", "TTFT p50 ms", "p50 ms", "p90 ms", "p99 ms", "Tokens/s p50", "Validation failures", "Retries", "Errors", "Hedges won", "Hedge tokens", "Cached prompt tokens"], rows)
+
+def write_profile(path, top=15):
+    """Write the recorded spans as a Chrome trace (chrome://tracing, ui.perfetto.dev) and print the slowest ones."""
+    tracing.export_chrome_trace(path)
+    rows = [[entry["name"], entry["count"], f"{entry['total_ms']:.1f}", f"{entry['mean_ms']:.1f}", f"{entry['max_ms']:.1f}"] for entry in tracing.summary(top)]
+    click.table("Profile", ["Span", "Calls", "Total ms", "Mean ms", "Max ms"], rows)
+    click.echo("Trace written to: {path}", path=path)
+
 @click.command()
-@click.argument('input', type=str)
+@click.argument('input', type=str, required=False)
 @click.option('--debug', '-d', is_flag=True, default=False, help="Run with :point_right: debug output")
 @click.option('--language', '-l', type=str, default=None, help="Language for the output")
+@click.option('--languages', type=str, default=None, envvar="JUNIOR_LANGUAGES", help="Comma separated ISO 639-1 codes of the languages to detect the input in (e.g. 'es,pt'; english is always included)")
 @click.option('--output-dir', '-o', type=str, default="", help="Directory to save output")
-def cli(input, debug, language, output_dir):
+@click.option('--stats', 'stats', is_flag=True, default=False, help="Report the recorded per model latency and throughput instead of processing an input")
+@click.option('--json', 'as_json', is_flag=True, default=False, help="Output --stats as JSON")
+@click.option('--output-format', type=click.Choice(["auto", "rich", "jsonl"]), default="auto", help="'jsonl' emits JSON lines events without translation or rich rendering; 'auto' uses it when the output is redirected")
+@click.option('--profile', is_flag=True, default=False, help="Trace where the run spends its time (Chrome trace JSON and summary at exit)")
+def cli(input, debug, language, languages, output_dir, stats, as_json, output_format, profile):
     """Process the input"""
+    if profile:
+        tracing.enable()
+        atexit.register(write_profile, os.path.join(output_dir or os.getcwd(), "junior-trace.json"))
+    if output_format == "auto":
+        output_format = "jsonl" if is_output_redirected else "rich"
+    CLIManager.set_output_format(output_format)
+    if stats:
+        show_stats(as_json, output_dir)
+        return
+    if not input:
+        raise click.UsageError("Missing argument 'INPUT' (or use --stats).")
+    if languages:
+        try:
+            click.set_languages(languages.split(","))
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--languages'")
     click.setup_language(input, language)
     setup = Setup(language=click.target_lang)
     setup.run_initial_setup()
-    click.log("loaded settings: ",setup.settings)
+    if debug:
+        # loads (decrypts) the settings, which warm starts otherwise skip
+        click.log("loaded settings: ",setup.settings)
     #click.echo("[yellow]Processing input:[/yellow] {input}", input=input)
     click.echo("*Processing input:* {input}", input=input)
     def task_test():
         total_steps = 10
         for i in range(total_steps):
-            yield ("_Processing_ *step* {from}/{total}", { "from":i+1, "total": total_steps })
+            yield ("_Processing_ *step* {from}/{total}", { "from":i+1, "total": total_steps }, (i+1, total_steps))
             time.sleep(0.5)
 
     click.log("Starting *process*... :smiley:", { "name":"Pablo" })
@@ -1,14 +1,18 @@
-import os, sys, time, re
+import os, sys, re, json, threading, time
 import rich_click as click
 #import logging
 from rich import print
 from rich.console import Console
+from rich.markup import escape
 from rich.prompt import Prompt
+from rich.table import Table
 from simple_term_menu import TerminalMenu
 #from rich.logging import RichHandler
-from yaspin import yaspin, Spinner
+from yaspin import Spinner
 from junior.utils.localizer import Localizer
-from junior.utils.translator import TranslationService
+from junior.utils.translator import TranslationService, default_languages
+from junior.utils.progress import ProgressRenderer, iterate
+from junior.utils.tracing import span, traced
 
 # setup logging
 #FORMAT = "%(message)s"
@@ -18,16 +22,24 @@ from junior.utils.translator import TranslationService
 #log = logging.getLogger("rich")
 
 class CLIManager:
-    def __init__(self, debug=True, debug_prefix="DEBUG", domain="cli"):
+    # 'rich' or 'jsonl', shared by every CLIManager of the process; None picks 'jsonl' when stdout isn't a terminal
+    output_format = None
+    started = time.perf_counter()
+    emit_lock = threading.Lock()
+
+    def __init__(self, debug=True, debug_prefix="DEBUG", domain="cli", languages=default_languages):
         self.configure_rich_click()
         self.debug = debug
         self.debug_prefix = debug_prefix
         self.domain = domain
         self.target_lang = "en"
         self.console = Console()
+        # questions asked while stdout carries JSON lines events (created when first needed)
+        self.stderr_console = None
         locales_dir = os.path.join(os.path.dirname(__file__), "translations")
-        self.localizer = Localizer(locale_path=locales_dir, domain=domain, target_lang=self.target_lang, online=True)
-        self.translator = TranslationService()
+        self.localizer = Localizer(locale_path=locales_dir, domain=domain, target_lang=self.target_lang, online=True, languages=languages)
+        # detects and translates the user input: short free-form text, so it gets the accurate detector
+        self.translator = TranslationService(languages=languages, low_accuracy=False)
         self.input_text_english = ""
         self.color_mapping = {
             "*": "yellow",
@@ -35,8 +47,46 @@ class CLIManager:
             "|": "dim"
         }
         self._ = self.localizer._
+        # single-pass scanner of the color tokens, compiled when first needed
+        self.color_scanner = None
+        # memoized apply_color results and translated+colored templates by (template, lang, placeholders)
+        self.colored = {}
+        self.templates = {}
+        self.templates_version = None
         self.spinner = Spinner(["⭐", "✨", "🌟", "🚀"], 200)
 
+    @classmethod
+    def set_output_format(cls, output_format):
+        """Set the output format of every CLIManager: 'rich', 'jsonl' or 'auto' (jsonl when stdout isn't a terminal)."""
+        cls.output_format = None if output_format == "auto" else output_format
+
+    @property
+    def json_lines(self):
+        """Whether output is emitted as JSON lines events (untranslated, without rich rendering)."""
+        if CLIManager.output_format is None:
+            return not sys.stdout.isatty()
+        return CLIManager.output_format == "jsonl"
+
+    def emit(self, event, **fields):
+        """Write a JSON lines event to stdout, with the seconds elapsed since start ('t')."""
+        line = json.dumps({"event": event, "domain": self.domain, "t": round(time.perf_counter() - CLIManager.started, 4), **fields}, default=str, ensure_ascii=False)
+        with CLIManager.emit_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def set_languages(self, languages):
+        """Set the languages the input (and messages) can be detected as, e.g. from the --languages option."""
+        self.translator.set_languages(languages)
+        self.localizer.translator.set_languages(languages)
+
+    def plain(self, text, *args, **kwargs):
+        """Format a template without translating it and without color tokens."""
+        scanner = self.color_scanner or self.compile_color_scanner()
+        def strip(match):
+            return scanner.sub(strip, match.group(match.lastindex))
+        text = scanner.sub(strip, text)
+        return text.format(*args, **kwargs) if args or kwargs else text
+
     def configure_rich_click(self):
         """Configure rich_click with all necessary styles and settings."""
         click.rich_click.USE_RICH_MARKUP = True
@@ -56,64 +106,126 @@ class CLIManager:
     def setColorTokens(self, token_colors):
         """Set the token to color mappings."""
         self.color_mapping = token_colors
+        self.color_scanner = None
+        self.colored = {}
+        self.templates = {}
+
+    def compile_color_scanner(self):
+        """Compile every color token into one regex: one alternative (and group) per token, matching
+        pairs of the token with at least one non-token character between them."""
+        alternatives = [f'\\{token}([^\\{token}]+)\\{token}' for token in self.color_mapping]
+        self.colors = list(self.color_mapping.values())
+        self.color_scanner = re.compile("|".join(alternatives))
+        return self.color_scanner
 
     def apply_color(self, text):
-        """Wrap tokens with rich color tags based on the mappings."""
-        for token, color in self.color_mapping.items():
-            # Create a regex pattern that matches pairs of the token with at least one non-token character between them
-            pattern = re.compile(f'\\{token}([^\\{token}]+)\\{token}')
-            # Replace each found pair with Rich formatted color tags
-            text = pattern.sub(f'[{color}]\\1[/]', text)
-        return text 
+        """Wrap tokens with rich color tags based on the mappings, in a single pass (memoized)."""
+        if text in self.colored:
+            return self.colored[text]
+        scanner = self.color_scanner or self.compile_color_scanner()
+
+        def replace(match):
+            index = match.lastindex
+            # tokens nested inside the pair get their colors too
+            return f'[{self.colors[index - 1]}]{scanner.sub(replace, match.group(index))}[/]'
+
+        colored = scanner.sub(replace, text)
+        if len(self.colored) >= 4096:
+            self.colored.clear()
+        self.colored[text] = colored
+        return colored
+
+    def render(self, text, *args, **kwargs):
+        """Translate and colorize a template, then format it with the given values.
+
+        The translated and colored template is memoized by (template, language, placeholders),
+        so repeated messages (e.g. progress updates) only pay for the formatting.
+        """
+        if self.templates_version != self.localizer.version:
+            # a catalog changed (e.g. a prefetch finished); templates may have better translations now
+            self.templates = {}
+            self.templates_version = self.localizer.version
+        key = (text, self.target_lang, tuple(kwargs))
+        template = self.templates.get(key)
+        if template is None:
+            with span("cli.render_template"):
+                translated = self.localizer.translate_template(text, kwargs) if kwargs or args else self._(text)
+                template = self.apply_color(translated)
+            self.templates[key] = template
+            self.templates_version = self.localizer.version
+        return template.format(*args, **kwargs) if args or kwargs else template
 
     def echo(self, text, *args, **kwargs):
         """Echo messages with translation and formatting."""
-        # Translates the text and uses args and kwargs for formatting
-        translated_text = self._(text, *args, **kwargs)
-        # Apply color formatting
-        formatted_text = self.apply_color(translated_text)
+        if self.json_lines:
+            return self.emit("message", text=self.plain(text, *args, **kwargs))
+        # Translates and colors the text, then uses args and kwargs for formatting
+        formatted_text = self.render(text, *args, **kwargs)
         # Print the formatted text with 'Rich' support
         print(formatted_text)
 
     def echoDim(self, text, *args, **kwargs):
         """Echo messages with translation and formatting in dim color."""
-        # Translates the text and uses args and kwargs for formatting
-        translated_text = self._(text, *args, **kwargs)
-        # Apply color formatting
-        formatted_text = self.apply_color(translated_text)
+        if self.json_lines:
+            return self.emit("message", text=self.plain(text, *args, **kwargs), dim=True)
+        # Translates and colors the text, then uses args and kwargs for formatting
+        formatted_text = self.render(text, *args, **kwargs)
         # Print the formatted text with 'Rich' support
         print("[dim]"+formatted_text+"[/]")
 
     def prompt(self, text, *args, **kwargs):
         """Prompt a question to the user with formatting support."""
-        translated_text = text
+        if self.json_lines:
+            template, kw = text if isinstance(text, tuple) else (text, {})
+            answer = self.ask("prompt", self.plain(template, **kw), kwargs.get("default"))
+            return answer or kwargs.get("default")
+        formatted_text = text
         # check if text is a string or a tuple
         if isinstance(text, str):
-            # Translates the text to the user lang
-            translated_text = self._(text)
+            # Translates and colors the text in the user lang
+            formatted_text = self.render(text)
         elif isinstance(text, tuple):
             template, kw = text
-            # Translates the tuple text with (kwargs) into the user lang
-            translated_text = self._(template, **kw)
-        # Apply color formatting
-        formatted_text = self.apply_color(translated_text)
+            # Translates and colors the tuple text with (kwargs) in the user lang
+            formatted_text = self.render(template, **kw)
         # Prompts the formatted text with 'Rich' support
         return Prompt.ask(formatted_text, *args, **kwargs)
 
+    def ask(self, event, text, default=None, choices=None):
+        """Get an answer in JSON lines mode, where stdout only carries events.
+
+        The question is emitted as a 'prompt' or 'select' event. With a terminal on stdin it's
+        asked on stderr; otherwise the answer is read as a line from stdin. When stdin is closed,
+        the default is used or, without one, an 'error' event is emitted and the process exits
+        (instead of waiting for an answer that can't come).
+        """
+        self.emit(event, text=text, choices=choices, default=default)
+        if sys.stdin.isatty():
+            if self.stderr_console is None:
+                self.stderr_console = Console(stderr=True)
+            return Prompt.ask(escape(text), console=self.stderr_console, choices=choices, default=default)
+        answer = sys.stdin.readline()
+        if not answer and default is None:
+            self.emit("error", reason="input_required", text=text)
+            sys.exit(1)
+        return answer.strip()
+
     def select(self, text, choices: list[str], default):
         """Prompt a question to the user with choices and formatting support."""
+        if self.json_lines:
+            template, kw = text if isinstance(text, tuple) else (text, {})
+            answer = self.ask("select", self.plain(template, **kw), default, choices=choices)
+            return answer if answer in choices else default
         # uses rich prompt
-        translated_text = text
+        formatted_text = text
         # check if text is a string or a tuple
         if isinstance(text, str):
-            # Translates the text to the user lang
-            translated_text = self._(text)
+            # Translates and colors the text in the user lang
+            formatted_text = self.render(text)
         elif isinstance(text, tuple):
             template, kw = text
-            # Translates the tuple text with (kwargs) into the user lang
-            translated_text = self._(template, **kw)
-        # Apply color formatting
-        formatted_text = self.apply_color(translated_text)
+            # Translates and colors the tuple text with (kwargs) in the user lang
+            formatted_text = self.render(template, **kw)
 
         # Translate the choices and map them back to the original choices
         translated_choices = [self._(choice) for choice in choices]
@@ -129,7 +241,13 @@ class CLIManager:
         return choice_map[selected_translated_choice.chosen_menu_entry]
 
     def Choice(self, *args, **kwargs):
-        click.Choice(*args, **kwargs)
+        return click.Choice(*args, **kwargs)
+
+    def BadParameter(self, *args, **kwargs):
+        return click.BadParameter(*args, **kwargs)
+
+    def UsageError(self, *args, **kwargs):
+        return click.UsageError(*args, **kwargs)
     
     def debug_(self, text, *args, **kwargs):
         """Echo debug messages with formatting."""
@@ -137,6 +255,8 @@ class CLIManager:
         formatted_text = self.apply_color(text)
         if not self.debug:
             return
+        if self.json_lines:
+            return self.emit("debug", text=self.plain(text, *args, **kwargs))
         formatted_text = f"[green][dim]{self.domain}:{self.debug_prefix}: [blue]{formatted_text.format(*args, **kwargs)}[/][/]"
         # Print the formatted text with 'Rich' support
         print(formatted_text)
@@ -147,10 +267,23 @@ class CLIManager:
         formatted_text = self.apply_color(text)
         if not self.debug:
             return
+        if self.json_lines:
+            return self.emit("warning", text=self.plain(text, *args, **kwargs))
         formatted_text = f"[red][dim]{self.domain}:WARN:[/] [red]{formatted_text.format(*args, **kwargs)}[/][/]"
         # Print the formatted text with 'Rich' support
         print(formatted_text)
 
+    def table(self, title, columns, rows):
+        """Print a table with translated title and column headers."""
+        if self.json_lines:
+            return self.emit("table", title=self.plain(title), columns=columns, rows=rows)
+        table = Table(title=self.render(title))
+        for column in columns:
+            table.add_column(self._(column))
+        for row in rows:
+            table.add_row(*[str(cell) for cell in row])
+        self.console.print(table)
+
     def translate(self, text, target_lang="en", online=True):
         """Translate text (to english) using the shared TranslationService."""
         target_lang = target_lang if target_lang else self.target_lang
@@ -161,35 +294,138 @@ class CLIManager:
     
     def log(self, message, *args, **kwargs):
         """Log messages with translation and formatting."""
+        if self.json_lines:
+            return self.emit("log", text=self.plain(message), data=list(args))
         colored = self.apply_color(message)
         self.console.log(colored, emoji=True, *args, **kwargs)
 
-    def process(self, task, message="Processing", *args, **kwargs):
+    def describe_partial(self, partial):
+        """One line preview of the last generated field of a (partial) structured output."""
+        data = partial.model_dump() if hasattr(partial, "model_dump") else dict(partial)
+        filled = [(key, value) for key, value in data.items() if value not in (None, "", [], {})]
+        if not filled:
+            return "..."
+        key, value = filled[-1]
+        text = " ".join(str(value).split())
+        if len(text) > 60:
+            text = "..." + text[-57:]
+        return f"*{key}*: {escape(text)}"
+
+    def completed_fields(self, partial, completed, on_field=None, final=False):
+        """Report fields of a partial output that are done being generated.
+
+        A field is complete once a later field has started (or the output is final).
+        """
+        data = partial.model_dump() if hasattr(partial, "model_dump") else dict(partial)
+        keys = [key for key, value in data.items() if value not in (None, "", [], {})]
+        done = keys if final else keys[:-1]
+        for key in done:
+            if key not in completed:
+                completed.add(key)
+                if on_field:
+                    on_field(key, data[key])
+
+    def process(self, task, message="Processing", *args, on_field=None, **kwargs):
         """
         Process function with spinner and dynamic progress updates.
-        The task should be a generator that yields messages indicating progress.
+        The task should be a generator (or async generator) that yields messages indicating progress,
+        as (template, kwargs) or (template, kwargs, (completed, total)) tuples, or partial structured
+        outputs (e.g. from Brain.stream). For structured outputs, 'on_field(name, value)' gets called
+        as soon as each field is complete, and the last output is returned (None when the task
+        raised, e.g. a stream whose output didn't validate).
+        Updates never wait for the terminal: the display is redrawn at a fixed rate.
+        """
+        return self.process_many([(task, (message, kwargs))], on_field=on_field)[0]
+
+    @traced("cli.process")
+    def process_many(self, tasks, on_field=None):
+        """
+        Run several tasks concurrently (each in its own thread), showing one progress line per task.
+        Each task is given as (task, message) or (task, (template, kwargs)); see process for the updates.
+        Returns the last structured output of each task (None when it failed), in order.
         """
-        message_ = self._(message, **kwargs)
-        def colorize(text):
-            formatted_text = self.apply_color(text)
-            with self.console.capture() as capture:
-                self.console.print(formatted_text, end="")
-            return capture.get().strip()
-            
-        with yaspin(self.spinner, text=message_) as spinner:
-            try:
-                for template, kwargs in task():
-                    translated_update = self._(template, **kwargs)
-                    spinner.text = colorize(translated_update)
-                    time.sleep(0.1)  # Simulate time delay for demonstration
-                spinner.text = ""
-                spinner.ok(colorize("[green]✔[/] "+self._("Done")))
-            except Exception as e:
-                #spinner.text = ""
-                spinner.fail(colorize("[red]✖[/] "+self._("Error")))
-                self.console.print_exception(show_locals=True)
-                #self.echo("An error occurred: {e}",e=str(e))
+        outputs = [None] * len(tasks)
+        if self.json_lines:
+            def run_events(index):
+                task, message = tasks[index]
+                template, kwargs = message if isinstance(message, tuple) else (message, {})
+                outputs[index] = self.consume_events(task, index, self.plain(template, **kwargs), on_field)
+            threads = [threading.Thread(target=run_events, args=(index,), daemon=True) for index in range(len(tasks))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return outputs
+        with ProgressRenderer(self.console, spinner=self.spinner) as renderer:
+            task_ids = []
+            for task, message in tasks:
+                template, kwargs = message if isinstance(message, tuple) else (message, {})
+                task_ids.append(renderer.add(self.render(template, **kwargs)))
+
+            def run(index):
+                outputs[index] = self.consume(tasks[index][0], renderer, task_ids[index], on_field)
+
+            if len(tasks) == 1:
+                run(0)
+            else:
+                threads = [threading.Thread(target=run, args=(index,), daemon=True) for index in range(len(tasks))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        return outputs
+
+    def consume(self, task, renderer, task_id, on_field=None):
+        """Consume the updates of a task into its progress line; returns its last structured output (None when it failed)."""
+        output = None
+        completed = set()
+        try:
+            for update in iterate(task):
+                if isinstance(update, tuple):
+                    template, kwargs, *amount = update
+                    completed_steps, total = amount[0] if amount else (None, None)
+                    renderer.update(task_id, description=self.render(template, **kwargs), completed=completed_steps, total=total)
+                else:
+                    # structured outputs are shown as they arrive, untranslated
+                    output = update
+                    self.completed_fields(update, completed, on_field)
+                    renderer.update(task_id, description=self.apply_color(self.describe_partial(update)))
+            if output is not None:
+                self.completed_fields(output, completed, on_field, final=True)
+            renderer.finish(task_id, "[green]✔[/] "+self._("Done"))
+        except Exception as e:
+            # the last output of a failed task is a partial one
+            output = None
+            renderer.finish(task_id, "[red]✖[/] "+self._("Error"), ok=False)
+            self.console.print_exception(show_locals=True)
+            #self.echo("An error occurred: {e}",e=str(e))
+        return output
+
+    def consume_events(self, task, task_index, message, on_field=None):
+        """Consume the updates of a task as JSON lines events (progress, result, done); returns its last structured output (None when it failed)."""
+        output = None
+        completed = set()
+        started = time.perf_counter()
+        self.emit("task", task=task_index, message=message)
+        try:
+            for update in iterate(task):
+                if isinstance(update, tuple):
+                    template, kwargs, *amount = update
+                    completed_steps, total = amount[0] if amount else (None, None)
+                    self.emit("progress", task=task_index, message=self.plain(template, **kwargs), completed=completed_steps, total=total)
+                else:
+                    output = update
+                    self.completed_fields(update, completed, on_field)
+            if output is not None:
+                self.completed_fields(output, completed, on_field, final=True)
+                self.emit("result", task=task_index, output=output.model_dump() if hasattr(output, "model_dump") else output)
+            self.emit("done", task=task_index, ok=True, seconds=round(time.perf_counter() - started, 4))
+        except Exception as e:
+            output = None
+            self.emit("done", task=task_index, ok=False, error=str(e), seconds=round(time.perf_counter() - started, 4))
+        return output
 
+    @traced("cli.setup_language")
     def setup_language(self, input_text="", language=None):
         """Detect and set language for output based on input or specified language."""
         if language:
@@ -202,6 +438,9 @@ class CLIManager:
                 self.input_text_english = self.translate(input_text)
                 self.debug_("Input text in _English_: {input}",input=self.input_text_english)
         self.localizer.target_lang = self.target_lang
+        # translate the known messages of this domain in a few batched requests, in the background
+        if not self.json_lines:
+            self.localizer.prefetch()
         self.debug_("Output language set to: _{lang}_",lang=self.target_lang)
 
     def command(self, *args, **kwargs):
@@ -1,72 +1,90 @@
-import click
-import instructor
-from openai import OpenAI
-from groq import Groq
-from anthropic import Anthropic
-from pydantic import BaseModel
-from typing import Any, Dict, List, Union, Optional
+try:
+    from instructor.exceptions import InstructorRetryException
+except ImportError:  # instructor < 1.3 defines it with the retry loop
+    from instructor.retry import InstructorRetryException
+from pydantic import BaseModel, ValidationError
+from typing import Any, AsyncIterator, Dict, Iterator, List, Union, Optional
 from junior.utils.setup import Setup
-from junior.utils.docker_helper import DockerHelper
 from junior.utils.token_tracker import TokenTracker
-import tiktoken
+from junior.utils.telemetry import Telemetry
+from junior.utils.tokenizer import Tokenizer
+from junior.utils.llm_clients import ClientPool
+from junior.utils.routing import create_policy
+from junior.utils.ollama_helper import OllamaHelper
+from junior.utils.compression import split_text, split_instruction, map_prompt, reduce_prompt, condense_prompt
+from junior.utils.resilience import CircuitBreaker, backoff_delay, is_provider_failure, is_transient
+from junior.utils.tracing import span, traced
+from junior.utils.cache import Cache
+from junior.cli_manager import CLIManager
+import os, json, asyncio, hashlib, threading, time
+from pathlib import Path
+click = CLIManager(domain="brain")
 
 class Brain:
+    # hedged requests defaults, overridable through the 'HEDGING' key of the settings
+    hedging_defaults = {
+        "enabled": False,
+        "percentile": 95,      # hedge once the primary is slower than this latency percentile
+        "min_samples": 20,     # latency samples needed before trusting the percentile
+        "default_delay": 10,   # seconds to wait when there aren't enough samples
+    }
+    # retries of transient errors and circuit breakers, overridable through the 'RETRY' key of the settings
+    retry_defaults = {
+        "attempts": 3,           # tries per model for transient errors (rate limits, overloads, timeouts)
+        "base_delay": 0.5,       # seconds before the first retry, doubled (with jitter) on each retry
+        "max_delay": 20,         # longer Retry-After requests fall back to another model instead of waiting
+        "failure_threshold": 5,  # consecutive provider failures that open its circuit breaker
+        "reset_timeout": 30,     # seconds a breaker stays open before letting a trial call through
+    }
+
+    @traced("brain.init")
     def __init__(self):
         """Initialize the Brain class."""
         click.echo("Initializing Brain...")
         self.setup = Setup()
-        self.settings = self.setup.load_settings()
-        self.docker_helper = DockerHelper()
+        # warm starts skip the setup checks: verify the LLM settings (and keys) before the first call
+        self.setup.ensure_llm_settings()
+        self.settings = self.setup.settings
+        self.docker_helper = self.setup.docker_helper
         self.llm_configs = self.setup.llm_configs
+        self.token_tracker = TokenTracker()
+        self.telemetry = Telemetry()
+        self.tokenizer = Tokenizer()
+        self.validation_retries = 2
+        self._loop = None
+        self.hedging = {**self.hedging_defaults, **self.settings.get("HEDGING", {})}
+        self.retry = {**self.retry_defaults, **self.settings.get("RETRY", {})}
+        self.breakers = {}
+        self.routing_policy = create_policy(self.settings)
+        self.cache = Cache.shared()
+        self.last_route = []
 
         self.instructors = self.init_instructors()
         self.start_local_model_if_available()
 
-    def init_instructors(self) -> Dict[str, Any]:
-        """Initialize the instructor clients based on available API keys."""
-        instructors = {}
-
-        llm_settings = self.settings.get("LLM", {})
-        remote_llms = llm_settings.get("remote", {})
-
-        # Initialize remote instructors
-        for full_name, api_key in remote_llms.items():
-            if api_key:
-                provider, _ = full_name.split("/")
-                if provider.lower() == "openai":
-                    instructors[full_name] = instructor.from_openai(OpenAI(api_key=api_key))
-                elif provider.lower() == "ollama":
-                    instructors[full_name] = instructor.from_openai(OpenAI(api_key="ollama", base_url="http://localhost:11434/v1"), mode=instructor.Mode.JSON)
-                elif provider.lower() == "groq":
-                    instructors[full_name] = instructor.from_groq(Groq(api_key=api_key))
-                elif provider.lower() == "anthropic":
-                    instructors[full_name] = instructor.from_anthropic(Anthropic().messages.create,mode=instructor.Mode.ANTHROPIC_JSON)
-
-        # Add all local models that meet the system requirements
-        local_llms = llm_settings.get("local", {})
-        for full_name in local_llms.keys():
-            if full_name in self.llm_configs and self.llm_configs[full_name]["local"]:
-                instructors[full_name] = instructor.from_openai(OpenAI(api_key="ollama", base_url="http://localhost:11434/v1"), mode=instructor.Mode.JSON)
-                #instructors[full_name] = Instruct(api_key=None, provider="ollama")
-
-        return instructors
+    def init_instructors(self) -> ClientPool:
+        """Initialize the (lazy) instructor clients based on available API keys and local models."""
+        return ClientPool(self.settings, self.llm_configs)
 
     def start_local_model_if_available(self):
-        """Check, build, and run the local Ollama Docker instance if available."""
+        """Check, build, and run the local Ollama Docker instance if available, then prewarm the local models."""
         llm_settings = self.settings.get("LLM", {}).get("local", {})
 
-        if llm_settings:
-            # TODO consume the existing methods for this on Setup.py
+        if llm_settings and self.docker_helper.is_docker_running:
             click.echo("Local models available. Checking Ollama Docker instance...")
-            if not self.docker_helper.container_exists(self.setup.local_container_name):
-                click.echo("Starting Ollama Docker instance...")
-                self.docker_helper.create_instance(name=self.setup.local_container_name, network="bridge")
+            if not self.setup.start_local_server():
+                return
 
-            click.echo("Ensuring local models are available...")
-            # Add your logic to ensure models are downloaded and available
+            # load the local models in the background (as many as fit in RAM) so the first call is warm
+            models = {}
+            for name in llm_settings:
+                if name in self.llm_configs:
+                    models[self.model_id(name)] = self.llm_configs[name]["required_disk_space"] or 0
+            ollama = self.setup.ollama_settings()
+            OllamaHelper(base_url=f"http://localhost:{self.setup.ollama_port}", keep_alive=ollama["keep_alive"]).prewarm(models)
 
     def count_tokens(self, prompt: str, model: str = "gpt-4") -> int:
-        """Count tokens in the given prompt based on GPT-4.
+        """Count tokens in the given prompt using the tokenizer family of the model.
 
         Args:
             prompt (str): The input prompt.
@@ -75,51 +93,127 @@ class Brain:
         Returns:
             int: The count of tokens.
         """
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(prompt))
+        return self.tokenizer.count(prompt, model)
 
-    def choose_best_instructor(self, prompt: str, category: Optional[str] = "everything") -> Optional[Any]:
-        """Choose the best instructor for the given prompt and category.
+    @traced("brain.choose_best_model")
+    def choose_best_model(self, prompt: str, category: Optional[str] = "everything", exclude: Optional[List[str]] = None, explain: bool = False, verbose: bool = True, ignore_limits: bool = False) -> Optional[str]:
+        """Choose the name of the best model for the given prompt and category.
+
+        Models over their current per-minute or per-day limits, or whose provider circuit breaker
+        is open, are replaced by the first usable model of their 'fallback' chain or skipped. The eligible models are then
+        ranked by the routing policy (see junior.utils.routing); the ranking is kept on
+        'last_route' for inspection.
 
         Args:
             prompt (str): Input prompt string.
             category (Optional[str], optional): Category of the task. Defaults to "everything".
+            exclude (Optional[List[str]], optional): Models that must not be chosen. Defaults to None.
+            explain (bool, optional): Print the score components of every candidate. Defaults to False.
+            verbose (bool, optional): Print the selected model. Defaults to True.
+            ignore_limits (bool, optional): Don't skip models over their rate limits. Defaults to False.
 
         Returns:
-            Optional[Instruct]: The most suitable instructor or None.
+            Optional[str]: The name of the most suitable model or None.
         """
-        token_count = self.count_tokens(prompt)
-        best_instructor = None
-        best_match_score = float("-inf")
+        # cheap length based estimate; exact counts only happen for models close to their window
+        estimate = self.tokenizer.estimate(prompt)
+        candidates = {}
+
+        exclude = exclude or []
 
         for name, config in self.llm_configs.items():
-            if name in self.instructors:
-                if self.token_tracker.model_exceeds_limits(name, config["limits"]):
-                    fallback = config["fallback"]
-                    if fallback and fallback in self.instructors:
-                        name = fallback
-                        config = self.llm_configs[fallback]
-                    else:
+            if name in self.instructors and name not in exclude:
+                if not self.is_usable(name, estimate, ignore_limits):
+                    name = self.next_fallback(name, estimate, exclude, ignore_limits)
+                    if not name:
                         continue
+                    config = self.llm_configs[name]
 
                 supports_category = category in config["expert_for"]
-                within_token_limit = token_count + config["max_output_tokens"] <= config["context_window_tokens"]
+                window = self.tokenizer.fits(prompt, name, config["context_window_tokens"] - config["max_output_tokens"])
 
-                if supports_category and within_token_limit:
-                    score = config["context_window_tokens"] - token_count  # Prioritize by remaining tokens
-                    if score > best_match_score:
-                        best_match_score = score
-                        best_instructor = self.instructors[name]
+                if supports_category and window["fits"] and name not in candidates:
+                    candidates[name] = {
+                        "name": name,
+                        "config": config,
+                        "tokens": window["tokens"],
+                        "category": category,
+                        "headroom": self.token_tracker.remaining_headroom(name, config["limits"]),
+                        "ewma": self.telemetry.ewma(name),
+                    }
 
-        if best_instructor:
-            click.echo(f"Selected instructor: {name}")
-        else:
+        self.last_route = self.routing_policy.rank(list(candidates.values()))
+        best_name = self.last_route[0]["name"] if self.last_route else None
+
+        if explain:
+            for rank, item in enumerate(self.last_route, start=1):
+                components = ", ".join(f"{key}={value}" for key, value in item["components"].items())
+                click.echoDim("{rank}. {name} score={score} ({components})", rank=rank, name=item["name"], score=item["score"], components=components)
+
+        if verbose and best_name:
+            click.echo("Selected instructor: {name} ({policy} policy)", name=best_name, policy=self.routing_policy.name)
+        elif verbose:
             click.echo("No suitable instructor found.")
 
-        return best_instructor
+        return best_name
+
+    def breaker(self, model_name: str) -> CircuitBreaker:
+        """Get the circuit breaker of the provider of a model (e.g. 'openai' for 'openai/gpt-4')."""
+        provider = model_name.split("/", 1)[0]
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(self.retry["failure_threshold"], self.retry["reset_timeout"])
+        return self.breakers[provider]
+
+    def is_usable(self, model_name: str, tokens: int = 0, ignore_limits: bool = False) -> bool:
+        """Check if a model can take a request now: it has a client, its provider breaker isn't open and it's within its limits."""
+        if model_name not in self.instructors or not self.breaker(model_name).allow():
+            return False
+        return ignore_limits or not self.token_tracker.model_exceeds_limits(model_name, self.llm_configs[model_name]["limits"], tokens=tokens)
+
+    def next_fallback(self, model_name: str, tokens: int = 0, exclude: Optional[List[str]] = None, ignore_limits: bool = False) -> Optional[str]:
+        """Follow the 'fallback' chain of a model (from llm_configs) up to the first usable model.
 
+        Args:
+            model_name (str): Model to replace.
+            tokens (int, optional): Estimated tokens of the request. Defaults to 0.
+            exclude (Optional[List[str]], optional): Models that must not be chosen. Defaults to None.
+            ignore_limits (bool, optional): Don't skip models over their rate limits. Defaults to False.
+
+        Returns:
+            Optional[str]: The fallback model or None if the chain has no usable model.
+        """
+        exclude = exclude or []
+        seen = {model_name}
+        fallback = self.llm_configs.get(model_name, {}).get("fallback")
+        while fallback and fallback not in seen and fallback in self.llm_configs:
+            if fallback not in exclude and self.is_usable(fallback, tokens, ignore_limits):
+                return fallback
+            seen.add(fallback)
+            fallback = self.llm_configs[fallback].get("fallback")
+        return None
 
-    def prompt(self, prompt: str, output_schema: BaseModel, llm: str = None, category: Optional[str] = "everything") -> Union[BaseModel, None]:
+    def choose_best_instructor(self, prompt: str, category: Optional[str] = "everything") -> Optional[Any]:
+        """Choose the best instructor for the given prompt and category.
+
+        Args:
+            prompt (str): Input prompt string.
+            category (Optional[str], optional): Category of the task. Defaults to "everything".
+
+        Returns:
+            Optional[Instruct]: The most suitable instructor or None.
+        """
+        name = self.choose_best_model(prompt, category)
+        return self.instructors[name] if name else None
+
+
+    def resolve_model(self, prompt: str, llm: str = None, category: Optional[str] = "everything") -> Optional[str]:
+        """Get the model to use for a prompt: the specified LLM if available, else the best one."""
+        if llm and llm.lower() in self.instructors:
+            click.echo("Using specified LLM: {llm}", llm=llm)
+            return llm.lower()
+        return self.choose_best_model(prompt, category)
+
+    def prompt(self, prompt: str, output_schema: BaseModel, llm: str = None, category: Optional[str] = "everything", hedge: Optional[bool] = None, context: Optional[str] = None) -> Union[BaseModel, None]:
         """Standardize calls to LLMs using a single prompt method.
 
         Args:
@@ -127,30 +221,594 @@ class Brain:
             output_schema (BaseModel): Pydantic model to enforce the output schema.
             llm (str, optional): Specific LLM name to use. Defaults to None.
             category (Optional[str], optional): Category of the task. Defaults to "everything".
+            hedge (Optional[bool], optional): Hedge slow requests with another model. Defaults to the 'HEDGING' setting.
+            context (Optional[str], optional): Stable context (e.g. Code2Prompt output) sent as a cacheable prefix. Defaults to None.
 
         Returns:
             Union[BaseModel, None]: The validated output schema instance or None.
         """
-        if llm and llm.lower() in self.instructors:
-            click.echo(f"Using specified LLM: {llm}")
-            instructor = self.instructors[llm.lower()]
-        else:
-            instructor = self.choose_best_instructor(prompt, category)
+        return self.run_sync(self.aprompt(prompt, output_schema, llm=llm, category=category, hedge=hedge, context=context))
 
-        if not instructor:
+    def gather(self, requests: List[Dict]) -> List[Union[BaseModel, None]]:
+        """Run several prompts concurrently (see agather) and wait for all of them."""
+        return self.run_sync(self.agather(requests))
+
+    def run_sync(self, coroutine) -> Any:
+        """Run a coroutine on the Brain event loop, which lives in a background thread
+        so that async connections stay warm between sync calls."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="brain-loop", daemon=True).start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            # e.g. CTRL-C while waiting: stop the request instead of leaving it running
+            future.cancel()
+            raise
+
+    async def aprompt(self, prompt: str, output_schema: BaseModel, llm: str = None, category: Optional[str] = "everything", hedge: Optional[bool] = None, context: Optional[str] = None, compress: bool = True) -> Union[BaseModel, None]:
+        """Async version of prompt; requests to a provider are limited by its 'concurrency' setting.
+
+        Args:
+            prompt (str): Input prompt string.
+            output_schema (BaseModel): Pydantic model to enforce the output schema.
+            llm (str, optional): Specific LLM name to use. Defaults to None.
+            category (Optional[str], optional): Category of the task. Defaults to "everything".
+            hedge (Optional[bool], optional): Hedge slow requests with another model. Defaults to the 'HEDGING' setting.
+            context (Optional[str], optional): Stable context (e.g. Code2Prompt output) sent as a cacheable prefix. Defaults to None.
+            compress (bool, optional): Map-reduce inputs larger than every context window. Defaults to True.
+
+        Returns:
+            Union[BaseModel, None]: The validated output schema instance or None.
+        """
+        full_prompt = self.full_prompt(prompt, context)
+        model_name = self.resolve_model(full_prompt, llm, category)
+
+        if not model_name:
+            if compress and self.tokenizer.estimate(full_prompt) > self.context_budget(category) > 0:
+                return await self.amap_reduce(prompt, output_schema, category, context)
             click.echo("No suitable LLM found.")
             return None
 
-        tokens_used = self.count_tokens(prompt)
-        response = instructor(prompt)
-        self.token_tracker.update_model_usage(instructor.provider, tokens=tokens_used)
+        if hedge if hedge is not None else self.hedging["enabled"]:
+            return await self.ahedged_call(model_name, prompt, output_schema, category, context=context)
+        return await self.acall_model(model_name, prompt, output_schema, context=context)
+
+    def context_budget(self, category: Optional[str] = "everything") -> int:
+        """Largest prompt (in tokens) that any available model of the category accepts."""
+        budgets = [
+            config["context_window_tokens"] - config["max_output_tokens"]
+            for name, config in self.llm_configs.items()
+            if name in self.instructors and category in config["expert_for"]
+        ]
+        return max(budgets, default=0)
 
+    @traced("brain.map_reduce")
+    async def amap_reduce(self, prompt: str, output_schema: BaseModel, category: Optional[str] = "everything", context: Optional[str] = None) -> Union[BaseModel, None]:
+        """Process an input larger than every context window: split it into chunks, extract a
+        partial result from each chunk in parallel (map) and merge them under the schema (reduce).
+        Every map and reduce request includes the instruction: the prompt when a context is given,
+        else its leading and trailing paragraphs (see split_instruction). Partial results are cached
+        by chunk hash, so re-runs only process the chunks that changed.
+        """
+        if context:
+            instruction, content = prompt, context
+        else:
+            instruction, content = split_instruction(prompt)
+        budget = self.context_budget(category)
+        # room left for a chunk next to the instruction and the schema, with a margin for estimates
+        chunk_tokens = int((budget - self.tokenizer.estimate(instruction) - 1000) * 0.8)
+        if chunk_tokens <= 0:
+            click.echo("No suitable LLM found.")
+            return None
+        chunks = split_text(content, int(chunk_tokens * self.tokenizer.chars_per_token))
+        click.echo("Input exceeds every context window; processing it in {parts} parts...", parts=len(chunks))
+
+        async def run_map(index, chunk):
+            key = "mapreduce:" + hashlib.sha1((output_schema.__name__ + instruction + chunk).encode("utf-8")).hexdigest()
+            cached = self.cache.get(key)
+            if cached:
+                return output_schema.model_validate_json(cached)
+            result = await self.aprompt(map_prompt(instruction, index, len(chunks)), output_schema, category=category, context=chunk, compress=False)
+            if result is not None:
+                self.cache.set(key, result.model_dump_json(), ttl=7 * 24 * 3600)
+            return result
+
+        results = await asyncio.gather(*(run_map(index, chunk) for index, chunk in enumerate(chunks, start=1)))
+        partials = [result for result in results if result is not None]
+        return await self.areduce(instruction, output_schema, partials, category, budget)
+
+    async def areduce(self, instruction: str, output_schema: BaseModel, partials: List[BaseModel], category: Optional[str], budget: int, condensed: bool = False) -> Union[BaseModel, None]:
+        """Merge partial results into one; halves are merged first (concurrently) when they don't fit
+        in one request, and a pair that doesn't fit is condensed (once) before merging it."""
+        if len(partials) <= 1:
+            return partials[0] if partials else None
+        text = reduce_prompt(instruction, partials)
+        if self.tokenizer.estimate(text) <= budget * 0.8:
+            return await self.aprompt(text, output_schema, category=category, compress=False)
+        if len(partials) == 2:
+            if condensed:
+                click.echo("Partial results are too large to be merged.")
+                return None
+            # a pair can't be split any further: shrink each partial to a third of the budget first
+            max_tokens = int(budget * 0.8) // 3
+            shrunk = await asyncio.gather(*(
+                self.aprompt(condense_prompt(instruction, partial, max_tokens), output_schema, category=category, compress=False)
+                for partial in partials
+            ))
+            return await self.areduce(instruction, output_schema, [result for result in shrunk if result is not None], category, budget, condensed=True)
+        middle = len(partials) // 2
+        merged = await asyncio.gather(
+            self.areduce(instruction, output_schema, partials[:middle], category, budget),
+            self.areduce(instruction, output_schema, partials[middle:], category, budget),
+        )
+        return await self.areduce(instruction, output_schema, [result for result in merged if result is not None], category, budget)
+
+    def hedge_delay(self, model_name: str) -> float:
+        """Seconds to wait for a model before hedging its request."""
+        delay = self.telemetry.latency_percentile(model_name, self.hedging["percentile"], min_samples=self.hedging["min_samples"])
+        return delay if delay is not None else self.hedging["default_delay"]
+
+    async def ahedged_call(self, model_name: str, prompt: str, output_schema: BaseModel, category: Optional[str] = "everything", context: Optional[str] = None) -> Union[BaseModel, None]:
+        """Call a model and, if it hasn't answered within its hedge delay (or failed), send the same
+        request to the next eligible model. The first valid response wins and the other one is cancelled.
+        """
+        # model -> reserved tokens of the request each task has at the provider right now
+        sent = {}
+        tasks = {asyncio.ensure_future(self.acall_model(model_name, prompt, output_schema, context=context, sent=sent)): (model_name, sent)}
+        hedge_name = None
+        winner = None
         try:
-            validated_output = output_schema.parse_obj(response)
-            return validated_output
-        except Exception as e:
-            click.echo(f"Error validating response: {e}")
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=None if hedge_name else self.hedge_delay(model_name), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, _ = tasks.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        winner = name
+                        return result
+                if hedge_name is None:
+                    # primary is slow (or already failed): hedge with the next eligible model within its limits
+                    hedge_name = self.choose_best_model(self.full_prompt(prompt, context), category, exclude=[model_name]) or ""
+                    if hedge_name:
+                        sent = {}
+                        tasks[asyncio.ensure_future(self.acall_model(hedge_name, prompt, output_schema, context=context, sent=sent))] = (hedge_name, sent)
             return None
+        finally:
+            wasted_tokens = 0
+            for task, (_, sent) in tasks.items():
+                task.cancel()
+                # only a request already at the provider is wasted (acall_provider charges it to the
+                # limits); one still waiting for a concurrency slot or a backoff was never sent
+                wasted_tokens += sum(sent.values())
+            if hedge_name:
+                self.telemetry.record_hedge(hedge_name, won=winner == hedge_name, wasted_tokens=wasted_tokens)
+                click.echoDim("Hedged {model} with {hedge}: {winner} answered first, ~{tokens} tokens spent on the cancelled request.", model=model_name, hedge=hedge_name, winner=winner or "none", tokens=wasted_tokens)
+
+    async def agather(self, requests: List[Dict], return_exceptions: bool = False) -> List[Union[BaseModel, None]]:
+        """Run several aprompt requests concurrently.
+
+        If the caller gets cancelled (or a request fails without 'return_exceptions'),
+        the requests still running are cancelled too.
+
+        Args:
+            requests (List[Dict]): aprompt keyword arguments of each request (prompt, output_schema, llm, category, context).
+            return_exceptions (bool, optional): Return exceptions as results instead of raising. Defaults to False.
+
+        Returns:
+            List[Union[BaseModel, None]]: The results, in the order of the requests.
+        """
+        tasks = [asyncio.ensure_future(self.aprompt(**request)) for request in requests]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def prompt_many(self, prompts: List[str], output_schema: BaseModel, category: Optional[str] = "everything", concurrency: int = 8, checkpoint: bool = True, context: Optional[str] = None) -> Iterator[tuple]:
+        """Sync version of aprompt_many; yields (index, result) in completion order."""
+        return self.iterate_sync(self.aprompt_many(prompts, output_schema, category=category, concurrency=concurrency, checkpoint=checkpoint, context=context))
+
+    async def aprompt_many(self, prompts: List[str], output_schema: BaseModel, category: Optional[str] = "everything", concurrency: int = 8, checkpoint: bool = True, max_wait: float = 120, context: Optional[str] = None) -> AsyncIterator[tuple]:
+        """Apply the same output schema to many prompts.
+
+        Identical prompts are only sent once. Each prompt is routed when it gets dispatched, counting
+        the requests still in flight, so the batch spreads across every eligible model within its
+        'limits', waiting for rate-limit windows to free up when all of them are exhausted. Finished results are checkpointed under
+        ~/.junior/batches, so re-running an interrupted batch only sends what is missing.
+
+        Args:
+            prompts (List[str]): Input prompts.
+            output_schema (BaseModel): Pydantic model to enforce on every output.
+            category (Optional[str], optional): Category of the task. Defaults to "everything".
+            concurrency (int, optional): Maximum requests in flight. Defaults to 8.
+            checkpoint (bool, optional): Keep and resume progress from a checkpoint file. Defaults to True.
+            max_wait (float, optional): Seconds a prompt may wait for rate limits to free up. Defaults to 120.
+            context (Optional[str], optional): Context shared by every prompt, sent as a cacheable prefix. Defaults to None.
+
+        Yields:
+            tuple: (index of the prompt in 'prompts', validated output or None), in completion order.
+        """
+        unique = {}  # prompt hash -> indices of the prompt
+        for index, prompt in enumerate(prompts):
+            unique.setdefault(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), []).append(index)
+
+        checkpoint_path = self.batch_checkpoint_path(output_schema, unique, context) if checkpoint else None
+        done = self.load_batch_checkpoint(checkpoint_path, output_schema)
+        for key, result in done.items():
+            for index in unique.get(key, []):
+                yield index, result
+
+        semaphore = asyncio.Semaphore(concurrency)
+        async def run(key):
+            async with semaphore:
+                return key, await self.ascheduled_call(prompts[unique[key][0]], output_schema, category, max_wait, context=context)
+
+        tasks = [asyncio.ensure_future(run(key)) for key in unique if key not in done]
+        failed = False
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, result = await next_done
+                if result is None:
+                    failed = True
+                elif checkpoint_path:
+                    with open(checkpoint_path, "a", encoding="utf-8") as file:
+                        file.write(json.dumps({"key": key, "result": result.model_dump_json()}) + "\n")
+                for index in unique[key]:
+                    yield index, result
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        # a complete batch doesn't need its checkpoint anymore (failed prompts are retried on re-runs)
+        if checkpoint_path and not failed and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    async def ascheduled_call(self, prompt: str, output_schema: BaseModel, category: Optional[str] = "everything", max_wait: float = 120, context: Optional[str] = None) -> Union[BaseModel, None]:
+        """Route and call a prompt, waiting (up to max_wait seconds) while every eligible model is over its limits."""
+        waited = 0
+        full_prompt = self.full_prompt(prompt, context)
+        while True:
+            model_name = self.choose_best_model(full_prompt, category, verbose=False)
+            if model_name:
+                return await self.acall_model(model_name, prompt, output_schema, context=context)
+            if waited >= max_wait or not self.choose_best_model(full_prompt, category, verbose=False, ignore_limits=True):
+                click.echo("No suitable LLM found.")
+                return None
+            # rate-limit windows move in 5 seconds buckets
+            await asyncio.sleep(5)
+            waited += 5
+
+    @staticmethod
+    def batch_checkpoint_path(output_schema: BaseModel, unique: Dict, context: Optional[str] = None) -> str:
+        """Get the checkpoint file of a batch (identified by its schema, context and prompts)."""
+        directory = os.path.join(Path.home(), ".junior", "batches")
+        os.makedirs(directory, exist_ok=True)
+        batch_id = hashlib.sha1((output_schema.__name__ + (context or "") + "".join(sorted(unique))).encode("utf-8")).hexdigest()
+        return os.path.join(directory, f"{batch_id}.jsonl")
+
+    @staticmethod
+    def load_batch_checkpoint(checkpoint_path: Optional[str], output_schema: BaseModel) -> Dict:
+        """Load the results already finished by a previous run of a batch."""
+        done = {}
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return done
+        with open(checkpoint_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    done[entry["key"]] = output_schema.model_validate_json(entry["result"])
+                except (ValueError, KeyError, ValidationError):
+                    continue  # torn write of an interrupted run
+        return done
+
+    def iterate_sync(self, iterator: AsyncIterator) -> Iterator:
+        """Consume an async iterator from sync code, running it on the Brain event loop."""
+        try:
+            while True:
+                try:
+                    yield self.run_sync(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run_sync(iterator.aclose())
+
+    def stream(self, prompt: str, output_schema: BaseModel, llm: str = None, category: Optional[str] = "everything", context: Optional[str] = None) -> Iterator[BaseModel]:
+        """Sync version of astream, e.g. to be consumed by CLIManager.process."""
+        return self.iterate_sync(self.astream(prompt, output_schema, llm=llm, category=category, context=context))
+
+    async def astream(self, prompt: str, output_schema: BaseModel, llm: str = None, category: Optional[str] = "everything", context: Optional[str] = None) -> AsyncIterator[BaseModel]:
+        """Stream partially validated outputs while the model generates them.
+
+        Every item is a partial output_schema instance (fields not generated yet are None);
+        the last item is the fully validated output_schema instance. When the call or the
+        final validation fails, RuntimeError is raised instead, so the last partial (which
+        isn't valid) is never mistaken for the output.
+
+        Args:
+            prompt (str): Input prompt string.
+            output_schema (BaseModel): Pydantic model to enforce the output schema.
+            llm (str, optional): Specific LLM name to use. Defaults to None.
+            category (Optional[str], optional): Category of the task. Defaults to "everything".
+            context (Optional[str], optional): Stable context (e.g. Code2Prompt output) sent as a cacheable prefix. Defaults to None.
+
+        Yields:
+            BaseModel: Partial outputs, then the validated output.
+
+        Raises:
+            RuntimeError: The model failed or its output didn't validate.
+        """
+        model_name = self.resolve_model(self.full_prompt(prompt, context), llm, category)
+        if not model_name:
+            click.echo("No suitable LLM found.")
+            return
+
+        breaker = self.breaker(model_name)
+        if not breaker.allow():
+            click.warn_("Skipping {model}: circuit breaker of its provider is open.", model=model_name)
+            return
+
+        instructor = self.instructors.get_async(model_name)
+        config = self.llm_configs.get(model_name, {})
+        request = {
+            "model": self.model_id(model_name),
+            "response_model": output_schema,
+            "max_tokens": config.get("max_output_tokens", 1024),
+            **self.build_messages(model_name, prompt, context),
+        }
+        partial = None
+        ttft = None
+        error = False
+        reserved = self.tokenizer.estimate(self.full_prompt(prompt, context), model_name)
+        self.token_tracker.reserve(model_name, tokens=reserved)
+        started = time.perf_counter()
+        breaker.before_call()
+
+        # the span includes the time the consumer spends between partial outputs
+        with span("brain.stream", model=model_name):
+            async with self.instructors.limit(model_name):
+                try:
+                    if model_name.startswith("anthropic/"):
+                        # instructor can't stream partial objects from Anthropic; yield the whole output once
+                        partial = await instructor.chat.completions.create(**request)
+                        ttft = time.perf_counter() - started
+                        yield partial
+                    else:
+                        async for partial in instructor.chat.completions.create_partial(**request):
+                            if ttft is None:
+                                ttft = time.perf_counter() - started
+                            yield partial
+                    breaker.record_success()
+                except Exception as e:
+                    error = True
+                    if is_provider_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    click.warn_("Error calling {model}: {error}", model=model_name, error=str(e))
+                finally:
+                    # e.g. the consumer stopped early
+                    breaker.cancel_call()
+                    self.token_tracker.release(model_name, tokens=reserved)
+
+        latency = time.perf_counter() - started
+        validated_output = None
+        if partial is not None and not error:
+            try:
+                validated_output = output_schema.model_validate(partial.model_dump())
+            except ValidationError as e:
+                click.warn_("Error validating response: {error}", error=str(e))
+
+        # streamed responses don't report usage
+        tokens_in = self.tokenizer.count_segments([context or "", prompt], model_name)
+        tokens_out = self.count_tokens(partial.model_dump_json(), model_name) if partial is not None else 0
+        self.token_tracker.update_model_usage(model_name, tokens=tokens_in + tokens_out)
+        self.telemetry.record(
+            model_name,
+            latency=latency,
+            ttft=ttft,
+            tokens_in=tokens_in,
+            tokens_out=tokens_out,
+            validation_failures=int(validated_output is None and partial is not None and not error),
+            error=error or validated_output is None,
+        )
+        if validated_output is None:
+            raise RuntimeError(f"Streaming from {model_name} failed" + (": no output" if partial is None else ": the output didn't validate"))
+        yield validated_output
+
+    async def acall_model(self, model_name: str, prompt: str, output_schema: BaseModel, context: Optional[str] = None, fallback: bool = True, sent: Optional[Dict] = None) -> Union[BaseModel, None]:
+        """Call a specific model; when its provider fails (or its circuit breaker is open)
+        the request follows the 'fallback' chain of the model.
+
+        Args:
+            model_name (str): Name of the model (as in llm_configs).
+            prompt (str): Input prompt string.
+            output_schema (BaseModel): Pydantic model to enforce the output schema.
+            context (Optional[str], optional): Stable context sent as a cacheable prefix. Defaults to None.
+            fallback (bool, optional): Follow the fallback chain on provider errors. Defaults to True.
+            sent (Dict, optional): Gets model -> reserved tokens while a request is at the provider, so a caller cancelling the call knows if it was sent. Defaults to None.
+
+        Returns:
+            Union[BaseModel, None]: The validated output schema instance or None.
+        """
+        tried = []
+        while model_name:
+            tried.append(model_name)
+            with span("brain.call", model=model_name) as call:
+                validated_output, failed = await self.acall_provider(model_name, prompt, output_schema, context, sent=sent)
+                call.set(ok=validated_output is not None)
+            if not failed or not fallback:
+                return validated_output
+            model_name = self.next_fallback(model_name, self.tokenizer.estimate(self.full_prompt(prompt, context)), exclude=tried)
+            if model_name:
+                click.echo("Falling back from {model} to {fallback}.", model=tried[-1], fallback=model_name)
+        return None
+
+    async def acall_provider(self, model_name: str, prompt: str, output_schema: BaseModel, context: Optional[str] = None, sent: Optional[Dict] = None) -> tuple:
+        """Call a specific model, retrying schema validation failures and transient errors
+        (with jittered exponential backoff honoring Retry-After), and recording usage and telemetry.
+
+        Returns:
+            tuple: (validated output or None, whether the call failed because of an error rather than validation).
+        """
+        breaker = self.breaker(model_name)
+        if not breaker.allow():
+            click.warn_("Skipping {model}: circuit breaker of its provider is open.", model=model_name)
+            return None, True
+        sent = {} if sent is None else sent
+
+        instructor = self.instructors.get_async(model_name)
+        config = self.llm_configs.get(model_name, {})
+        validated_output = None
+        completion = None
+        validation_failures = 0
+        transient_failures = 0
+        error = None
+        # counted against the limits of the model while in flight, so concurrent routing sees it
+        reserved = self.tokenizer.estimate(self.full_prompt(prompt, context), model_name)
+        self.token_tracker.reserve(model_name, tokens=reserved)
+        started = time.perf_counter()
+        breaker.before_call()
+
+        try:
+            while True:
+                error = None
+                async with self.instructors.limit(model_name):
+                    # left in place if the call gets cancelled while the request is at the provider
+                    sent[model_name] = reserved
+                    try:
+                        validated_output, completion = await instructor.chat.completions.create_with_completion(
+                            model=self.model_id(model_name),
+                            response_model=output_schema,
+                            max_tokens=config.get("max_output_tokens", 1024),
+                            max_retries=1,
+                            **self.build_messages(model_name, prompt, context),
+                        )
+                    except (ValidationError, InstructorRetryException) as e:
+                        validation_failures += 1
+                        click.warn_("Error validating response: {error}", error=str(e))
+                    except Exception as e:
+                        error = e
+                        click.warn_("Error calling {model}: {error}", model=model_name, error=str(e))
+                    sent.pop(model_name, None)
+
+                if error is None:
+                    # the provider answered, even if the output didn't validate
+                    breaker.record_success()
+                    if validated_output is not None or validation_failures > self.validation_retries:
+                        break
+                    continue
+
+                if is_provider_failure(error):
+                    breaker.record_failure()
+                else:
+                    # the request was rejected (e.g. invalid), the provider itself is fine
+                    breaker.record_success()
+                if not is_transient(error) or transient_failures + 1 >= self.retry["attempts"] or not breaker.allow():
+                    break
+                # wait outside of the concurrency limit, so other requests can use the slot
+                delay = backoff_delay(transient_failures, self.retry["base_delay"], self.retry["max_delay"], error)
+                if delay > self.retry["max_delay"]:
+                    break
+                transient_failures += 1
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            breaker.cancel_call()
+            if model_name in sent:
+                # the prompt was sent and counts against the limits, even if the answer is never read
+                self.token_tracker.update_model_usage(model_name, tokens=sent[model_name])
+            raise
+        finally:
+            # no await until the usage is recorded below, so no request gets routed in between
+            self.token_tracker.release(model_name, tokens=reserved)
+
+        latency = time.perf_counter() - started
+        tokens_in, tokens_out = self.usage_tokens(completion)
+        if not tokens_in:
+            # provider didn't report usage; memoized, so usually free after routing
+            tokens_in = self.tokenizer.count_segments([context or "", prompt], model_name)
+        cache_read, cache_write = self.cache_tokens(completion)
+        self.token_tracker.update_model_usage(model_name, tokens=tokens_in + tokens_out)
+        self.telemetry.record(
+            model_name,
+            latency=latency,
+            tokens_in=tokens_in,
+            tokens_out=tokens_out,
+            cache_read_tokens=cache_read,
+            cache_write_tokens=cache_write,
+            validation_failures=validation_failures,
+            retries=validation_failures + transient_failures - int(validated_output is None and error is None),
+            error=error is not None or validated_output is None,
+        )
+        return validated_output, error is not None
+
+    @staticmethod
+    def full_prompt(prompt: str, context: Optional[str] = None) -> str:
+        """Get the whole text sent for a prompt and its context (for routing and counting)."""
+        return f"{context}\n\n{prompt}" if context else prompt
+
+    def build_messages(self, model_name: str, prompt: str, context: Optional[str] = None) -> Dict:
+        """Build the request messages so that the stable context is a cacheable prefix.
+
+        OpenAI (and compatible) providers cache the longest repeated prefix automatically, so the
+        context goes first as its own message. Anthropic needs an explicit cache_control breakpoint
+        after the context block (and the prompt caching beta header), only sent to models with
+        'prompt_caching' in their llm_configs.
+
+        Returns:
+            Dict: Keyword arguments for the chat completion call ('messages' and maybe 'extra_headers').
+        """
+        if not context:
+            return {"messages": [{"role": "user", "content": prompt}]}
+        if model_name.startswith("anthropic/"):
+            context_block = {"type": "text", "text": context}
+            if not self.llm_configs.get(model_name, {}).get("prompt_caching"):
+                return {"messages": [{"role": "user", "content": [context_block, {"type": "text", "text": prompt}]}]}
+            return {
+                "messages": [{"role": "user", "content": [
+                    {**context_block, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": prompt},
+                ]}],
+                "extra_headers": {"anthropic-beta": "prompt-caching-2024-07-31"},
+            }
+        return {"messages": [
+            {"role": "system", "content": context},
+            {"role": "user", "content": prompt},
+        ]}
+
+    @staticmethod
+    def cache_tokens(completion: Any) -> tuple:
+        """Get the (cache read, cache write) prompt tokens reported by an OpenAI or Anthropic completion."""
+        # the usage of the provider response, as instructor replaces 'usage' with its own totals
+        usage = getattr(completion, "provider_usage", None) or getattr(completion, "usage", None)
+        if usage is None:
+            return 0, 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or getattr(details, "cached_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return cache_read, cache_write
+
+    def model_id(self, model_name: str) -> str:
+        """Get the provider model id for a model name of llm_configs (e.g. 'openai/gpt-4' -> 'gpt-4')."""
+        config = self.llm_configs.get(model_name, {})
+        return config.get("model") or model_name.split("/", 1)[-1]
+
+    @staticmethod
+    def usage_tokens(completion: Any, default_in: int = 0) -> tuple:
+        """Get the (input, output) tokens reported by an OpenAI, Groq or Anthropic completion."""
+        # instructor's usage totals its validation retries, but drops Anthropic's cache fields
+        usage = getattr(completion, "usage", None) or getattr(completion, "provider_usage", None)
+        if usage is None:
+            return default_in, 0
+        tokens_in = getattr(usage, "prompt_tokens", None)
+        if tokens_in is None and getattr(usage, "input_tokens", None) is not None:
+            # Anthropic reports cached prompt tokens apart from input_tokens
+            tokens_in = usage.input_tokens + sum(Brain.cache_tokens(completion))
+        tokens_in = tokens_in or default_in
+        tokens_out = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+        return tokens_in, tokens_out
 
 # Example Pydantic output schema
 class ExampleOutputSchema(BaseModel):
@@ -165,4 +823,4 @@ if __name__ == "__main__":
 
     result = brain.prompt(prompt_str, schema)
     if result:
-        click.echo(result.model_dump_json(indent=4))
+        print(result.model_dump_json(indent=4))
@@ -1,12 +1,41 @@
-import os, json, time
+import os, json, time, threading
 from pathlib import Path
 
 class Cache:
-    def __init__(self, directory=None):
+    # caches returned by Cache.shared: cache file -> Cache
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, directory=None, namespace="cache", max_entries=None):
+        """Get the cache of a file shared by the whole process, creating it on first use.
+
+        Separate Cache objects on the same file each write their own copy of it, so the last
+        one saved would drop the entries of the others.
+
+        Args:
+            directory (str, optional): Directory of the cache file. Defaults to ~/.junior.
+            namespace (str, optional): Name of the cache file. Defaults to "cache".
+            max_entries (int, optional): Maximum entries kept (used when the cache is first created). Defaults to no limit.
+
+        Returns:
+            Cache: The cache of the file.
+        """
+        cache = cls(directory, namespace, max_entries, load=False)
+        with cls._shared_lock:
+            if cache.cache_file not in cls._shared:
+                cache.cache = cache._load_cache()
+                cls._shared[cache.cache_file] = cache
+            return cls._shared[cache.cache_file]
+
+    def __init__(self, directory=None, namespace="cache", max_entries=None, load=True):
         """Initialize the cache object with a directory.
 
         Args:
             directory (str, optional): Directory to store the cache file. If not provided, defaults to ~/.m.
+            namespace (str, optional): Name of the cache file, so unrelated caches don't share one file. Defaults to "cache".
+            max_entries (int, optional): Maximum entries kept; the least recently used ones are evicted first. Defaults to no limit.
+            load (bool, optional): Load the cache file now. Defaults to True.
         """
         if directory is None:
             # Default to ~/.m directory
@@ -19,8 +48,11 @@ class Cache:
         os.makedirs(directory, exist_ok=True)
 
         # Path to the cache file
-        self.cache_file = os.path.join(directory, "cache.json")
-        self.cache = self._load_cache()
+        self.cache_file = os.path.join(directory, f"{namespace}.json")
+        self.max_entries = max_entries
+        # guards the entries (and their order) against concurrent threads, e.g. translation prefetches
+        self.lock = threading.RLock()
+        self.cache = self._load_cache() if load else {}
 
     def _load_cache(self):
         """Load the cache from the JSON file or create a new empty cache."""
@@ -34,9 +66,24 @@ class Cache:
             return {}
 
     def _save_cache(self):
-        """Save the current cache to the JSON file."""
-        with open(self.cache_file, "w", encoding="utf-8") as f:
-            json.dump(self.cache, f, indent=4)
+        """Save the current cache to the JSON file (atomically, so readers never see a torn file)."""
+        with self.lock:
+            data = json.dumps(self.cache, indent=4)
+            tmp_file = f"{self.cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_file, self.cache_file)
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones, until the cache fits in max_entries."""
+        if self.max_entries is None or len(self.cache) <= self.max_entries:
+            return
+        now = time.time()
+        for key in [key for key, entry in self.cache.items() if entry["expire_time"] is not None and entry["expire_time"] <= now]:
+            del self.cache[key]
+        # entries are kept in least recently used order
+        for key in list(self.cache)[:max(0, len(self.cache) - self.max_entries)]:
+            del self.cache[key]
 
     def set(self, key, value, ttl=None):
         """Set a value in the cache with an optional TTL (Time-to-Live).
@@ -46,12 +93,27 @@ class Cache:
             value (any): Value to be stored.
             ttl (int, optional): Time-to-Live in seconds. If not provided, the value is stored indefinitely.
         """
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items, ttl=None):
+        """Set several values in the cache, saving it once.
+
+        Args:
+            items (dict): Keys and values to store.
+            ttl (int, optional): Time-to-Live in seconds. If not provided, the values are stored indefinitely.
+        """
+        if not items:
+            return
         expire_time = time.time() + ttl if ttl else None
-        self.cache[key] = {
-            "value": value,
-            "expire_time": expire_time
-        }
-        self._save_cache()
+        with self.lock:
+            for key, value in items.items():
+                self.cache.pop(key, None)
+                self.cache[key] = {
+                    "value": value,
+                    "expire_time": expire_time
+                }
+            self._evict()
+            self._save_cache()
 
     def get(self, key):
         """Retrieve a value from the cache.
@@ -62,13 +124,17 @@ class Cache:
         Returns:
             any: The value if present and not expired, else None.
         """
-        if key in self.cache:
-            cache_entry = self.cache[key]
-            if cache_entry["expire_time"] is None or cache_entry["expire_time"] > time.time():
-                return cache_entry["value"]
-            else:
-                del self.cache[key]
-                self._save_cache()
+        with self.lock:
+            if key in self.cache:
+                cache_entry = self.cache[key]
+                if cache_entry["expire_time"] is None or cache_entry["expire_time"] > time.time():
+                    if self.max_entries is not None:
+                        # move to the most recently used end (persisted with the next save)
+                        self.cache[key] = self.cache.pop(key)
+                    return cache_entry["value"]
+                else:
+                    del self.cache[key]
+                    self._save_cache()
         return None
 
     def delete(self, key):
@@ -77,14 +143,16 @@ class Cache:
         Args:
             key (str): Key to delete.
         """
-        if key in self.cache:
-            del self.cache[key]
-            self._save_cache()
+        with self.lock:
+            if key in self.cache:
+                del self.cache[key]
+                self._save_cache()
 
     def clear(self):
         """Clear all cache entries."""
-        self.cache = {}
-        self._save_cache()
+        with self.lock:
+            self.cache = {}
+            self._save_cache()
 
 # Example Usage
 if __name__ == "__main__":
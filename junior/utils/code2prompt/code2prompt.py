@@ -4,6 +4,7 @@
 # also to generate a suitable prompt from a given code snippet (e.g. determine the language)
 # also to provide methods for templates such as summarization, filefiltering, etc.
 
+import sys
 from datetime import datetime
 from pathlib import Path
 from fnmatch import fnmatch
@@ -11,6 +12,7 @@ from importlib import import_module
 
 from junior.utils.code2prompt.comment_stripper import strip_comments
 from junior.utils.code2prompt.language_inference import infer_language
+from junior.utils.tracing import traced
 
 class Code2Prompt:
     def __init__(self, path, gitignore=None, file_filter=None, suppress_comments=False):
@@ -71,7 +73,7 @@ class Code2Prompt:
                 chunk = file.read(1024)
                 return b"\x00" in chunk  # A file is considered binary if it contains a null byte
         except IOError:
-            print(f"Error: The file at {file_path} could not be opened.")
+            print(f"Error: The file at {file_path} could not be opened.", file=sys.stderr)
             return False
 
     def find_parser(self, extension):
@@ -83,6 +85,7 @@ class Code2Prompt:
         except (ImportError, AttributeError):
             return None
 
+    @traced("code2prompt.create_markdown_context")
     def create_markdown_context(self):
         """Create a context object with content of files in a directory."""
         content = []
@@ -151,6 +154,7 @@ class Code2Prompt:
 
         return context
 
+    @traced("code2prompt.create_markdown_file")
     def create_markdown_file(self, output=None):
         """Create a Markdown file with the content of files in a directory."""
         context = self.create_markdown_context()
@@ -171,6 +175,6 @@ class Code2Prompt:
             output_path = Path(output)
             with output_path.open("w", encoding="utf-8") as md_file:
                 md_file.write(markdown_content)
-            print(f"Markdown file '{output_path}' created successfully.")
+            print(f"Markdown file '{output_path}' created successfully.", file=sys.stderr)
         else:
             print(markdown_content)
@@ -0,0 +1,93 @@
+import json
+from typing import List
+from pydantic import BaseModel
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Split a text into chunks of at most max_chars characters.
+
+    Chunks are cut at file sections ('## ' headers of Code2Prompt markdown) or paragraphs
+    when possible, then at lines, and only cut mid-line for lines longer than a chunk.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int): Maximum characters of a chunk.
+
+    Returns:
+        List[str]: The chunks, in order.
+    """
+    max_chars = max(1, max_chars)
+    pieces = []
+    for paragraph in text.split("\n\n"):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.split("\n"):
+            while len(line) > max_chars:
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            pieces.append(line)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        starts_section = piece.startswith("## ")
+        if current and (len(current) + len(piece) + 2 > max_chars or (starts_section and len(current) > max_chars // 2)):
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def split_instruction(prompt: str, max_chars: int = 2000) -> tuple:
+    """Split a prompt that came without a separate context into (instruction, content).
+
+    The task is usually stated in the first or last paragraph of a prompt, so those (when short
+    enough) become the instruction repeated in every map and reduce request; the paragraphs
+    between them are the content to split.
+
+    Args:
+        prompt (str): The whole prompt.
+        max_chars (int, optional): Longest paragraph taken as part of the instruction. Defaults to 2000.
+
+    Returns:
+        tuple: (instruction, content).
+    """
+    paragraphs = prompt.split("\n\n")
+    if len(paragraphs) < 2:
+        return "Process the following input.", prompt
+    head = paragraphs[0] if len(paragraphs[0]) <= max_chars else None
+    tail = paragraphs[-1] if len(paragraphs) > 2 and len(paragraphs[-1]) <= max_chars else None
+    if head is None and tail is None:
+        return "Process the following input.", prompt
+    content = paragraphs[(1 if head is not None else 0):(-1 if tail is not None else None)]
+    instruction = "\n\n".join(part for part in (head, tail) if part is not None)
+    return instruction, "\n\n".join(content)
+
+def map_prompt(prompt: str, index: int, total: int) -> str:
+    """Prompt used to extract a partial result from one chunk of the context."""
+    return (
+        f"{prompt}\n\n"
+        f"Note: the context is too large to be processed at once; this is part {index} of {total}. "
+        "Answer using only the information available in this part."
+    )
+
+def reduce_prompt(prompt: str, partials: List[BaseModel]) -> str:
+    """Prompt used to merge partial results into one result under the target schema."""
+    results = "\n".join(json.dumps(partial.model_dump(), ensure_ascii=False) for partial in partials)
+    return (
+        f"{prompt}\n\n"
+        "The context was processed in parts. These are the partial results, one JSON per line, each "
+        "extracted from a different part. Merge them into a single complete result, combining and "
+        "deduplicating their information:\n"
+        f"{results}"
+    )
+
+def condense_prompt(prompt: str, partial: BaseModel, max_tokens: int) -> str:
+    """Prompt used to shrink a partial result that is too large to be merged with another one."""
+    return (
+        f"{prompt}\n\n"
+        "This is a partial result of the task, extracted from one part of the context. Rewrite it under "
+        f"the same schema using at most about {max_tokens} tokens, keeping its most important information:\n"
+        f"{json.dumps(partial.model_dump(), ensure_ascii=False)}"
+    )
@@ -1,9 +1,11 @@
-import os, docker, shutil, tarfile
+import os, sys, json, hashlib, docker, shutil, tarfile
 from pathlib import Path
 from typing import List, Dict, Union
 import platform
+from junior.utils.tracing import traced
 
 class DockerHelper:
+    @traced("docker.connect")
     def __init__(self):
         """Initialize the Docker client and set default parameters."""
         self.client = None
@@ -30,12 +32,35 @@ class DockerHelper:
         Returns:
             str: Docker base URL (unix socket or tcp)
         """
+        return self.docker_host()
+
+    @staticmethod
+    def docker_host() -> str:
+        """Get the Docker host the docker CLI would use: DOCKER_HOST, else the active docker context, else the platform default.
+
+        Returns:
+            str: Docker host url, e.g. "unix:///var/run/docker.sock" or "tcp://localhost:2375"
+        """
+        if os.environ.get("DOCKER_HOST"):
+            return os.environ["DOCKER_HOST"]
+        config_dir = Path(os.environ.get("DOCKER_CONFIG") or Path.home() / ".docker")
+        context = os.environ.get("DOCKER_CONTEXT")
+        try:
+            if not context:
+                with open(config_dir / "config.json", "r", encoding="utf-8") as file:
+                    context = json.load(file).get("currentContext")
+            if context and context != "default":
+                # contexts are stored under the sha256 of their name
+                meta_path = config_dir / "contexts" / "meta" / hashlib.sha256(context.encode("utf-8")).hexdigest() / "meta.json"
+                with open(meta_path, "r", encoding="utf-8") as file:
+                    host = json.load(file).get("Endpoints", {}).get("docker", {}).get("Host")
+                if host:
+                    return host
+        except (OSError, ValueError):
+            pass
         if platform.system() == "Windows":
             return "tcp://localhost:2375"
-        elif platform.system() == "Darwin":
-            return "unix:///var/run/docker.sock"
-        else:
-            return "unix:///var/run/docker.sock"
+        return "unix:///var/run/docker.sock"
 
     def _is_docker_installed(self) -> bool:
         """Check if Docker is installed on the system.
@@ -112,15 +137,18 @@ class DockerHelper:
         except docker.errors.NotFound:
             return None
         except docker.errors.APIError as e:
-            print(f"API error occurred: {e}")
+            print(f"API error occurred: {e}", file=sys.stderr)
             return None
     
-    def create_instance(self, image: str = None, command: str = "tail -f /dev/null", name: str = None, network: str = None):
+    @traced("docker.create_instance")
+    def create_instance(self, image: str = None, command: str = "tail -f /dev/null", name: str = None, network: str = None, ports: Dict[str, Union[str, int]] = None, environment: Dict[str, str] = None):
         """Create a new Docker instance.
 
         Args:
             name (str, optional): Name for the Docker container. Defaults to "default_python_container".
             network (str, optional): Name of the Docker network bridge. Defaults to None.
+            ports (Dict[str, Union[str, int]], optional): Port mappings. Defaults to None.
+            environment (Dict[str, str], optional): Environment variables to set. Defaults to None.
             
         Returns:
             docker.models.containers.Container: The created container.
@@ -131,7 +159,7 @@ class DockerHelper:
         try:
             self.client.images.pull(image)
         except docker.errors.APIError as e:
-            print(f"Error pulling Docker image {image}: {e}")
+            print(f"Error pulling Docker image {image}: {e}", file=sys.stderr)
             raise RuntimeError("Unable to pull Docker image. Please verify your credentials and image name.")
 
         name = name or self.container_name
@@ -145,9 +173,13 @@ class DockerHelper:
 
         if network:
             container_params["network"] = network
+        if ports:
+            container_params["ports"] = ports
+        if environment:
+            container_params["environment"] = environment
 
         self.container = self.client.containers.run(**container_params)
-        print(f"Docker container '{name}' started.")
+        print(f"Docker container '{name}' started.", file=sys.stderr)
         return self.container
 
     def build_dockerfile(self, dockerfile_path: str, tag: str = "custom_python_image") -> str:
@@ -166,11 +198,11 @@ class DockerHelper:
         dockerfile_dir = str(Path(dockerfile_path).parent)
         try:
             self.client.images.build(path=dockerfile_dir, dockerfile=dockerfile_path, tag=tag)
-            print(f"Docker image '{tag}' built successfully.")
+            print(f"Docker image '{tag}' built successfully.", file=sys.stderr)
             self.image = tag
             return tag
         except docker.errors.BuildError as e:
-            print(f"Error building Docker image '{tag}': {e}")
+            print(f"Error building Docker image '{tag}': {e}", file=sys.stderr)
             raise RuntimeError(f"Unable to build Docker image from '{dockerfile_path}'.")
 
     def run_dockerfile(self, dockerfile_path: str, tag: str = "custom_python_image", name: str = "custom_python_container", ports: Dict[str, Union[str, int]] = None, environment: Dict[str, str] = None, volumes: Dict[str, Dict[str, str]] = None):
@@ -203,10 +235,10 @@ class DockerHelper:
                 environment=environment,
                 volumes=volumes
             )
-            print(f"Docker container '{name}' started using the image '{tag}'.")
+            print(f"Docker container '{name}' started using the image '{tag}'.", file=sys.stderr)
             return self.container
         except docker.errors.APIError as e:
-            print(f"Error running Docker container '{name}': {e}")
+            print(f"Error running Docker container '{name}': {e}", file=sys.stderr)
             raise RuntimeError(f"Unable to run Docker container '{name}'.")
 
     def write_file(self, local_file_path: str, container_dir_path: str):
@@ -226,7 +258,7 @@ class DockerHelper:
             self.container.put_archive(container_dir_path, f.read())
 
         os.remove(tar_path)
-        print(f"File '{local_file_path}' written to Docker container at '{container_dir_path}/{file_name}'.")
+        print(f"File '{local_file_path}' written to Docker container at '{container_dir_path}/{file_name}'.", file=sys.stderr)
 
     def write_folder(self, folder_path: str, container_path: str):
         """Write a local folder to the Docker instance.
@@ -243,8 +275,9 @@ class DockerHelper:
             self.container.put_archive(container_path, f.read())
 
         os.remove(tar_path)
-        print(f"Folder '{folder_path}' written to Docker container at '{container_path}'.")
+        print(f"Folder '{folder_path}' written to Docker container at '{container_path}'.", file=sys.stderr)
 
+    @traced("docker.execute_command")
     def execute_command(self, command: Union[str, List[str]]) -> str:
         """Execute a command within the Docker instance and capture output.
 
@@ -290,7 +323,7 @@ class DockerHelper:
             # Move the extracted file to the final location
             Path(local_path).parent.joinpath(extracted_file).rename(local_path)
 
-        print(f"File '{container_path}' retrieved from Docker container to '{local_path}'.")
+        print(f"File '{container_path}' retrieved from Docker container to '{local_path}'.", file=sys.stderr)
 
     def retrieve_folder(self, container_path: str, local_path: str):
         """Retrieve a folder from the Docker instance to the local filesystem.
@@ -310,7 +343,7 @@ class DockerHelper:
             tar.extractall(local_path)
 
         os.remove(tar_path)
-        print(f"Folder '{container_path}' retrieved from Docker container to '{local_path}'.")
+        print(f"Folder '{container_path}' retrieved from Docker container to '{local_path}'.", file=sys.stderr)
 
     def shutdown_and_remove_instance(self):
         """Shutdown and remove the Docker instance if it exists."""
@@ -319,7 +352,7 @@ class DockerHelper:
             self.container.stop()
             self.container.remove()
             self.container = None
-            print(f"Docker container '{name}' stopped and removed.")
+            print(f"Docker container '{name}' stopped and removed.", file=sys.stderr)
 
 # Example Usage
 """
@@ -0,0 +1,205 @@
+import asyncio, atexit, functools, threading, weakref
+from collections.abc import Mapping
+from typing import Any, Dict
+import httpx
+
+class ClientPool(Mapping):
+    # default HTTP settings, overridable through the 'HTTP' key of the settings
+    http_defaults = {
+        "pool_size": 20,
+        "keepalive": 10,
+        "keepalive_expiry": 60,
+        "timeout": 120,
+        "connect_timeout": 5,
+        "http2": True,
+        # concurrent requests per provider (async API)
+        "concurrency": {"openai": 8, "anthropic": 4, "groq": 4, "ollama": 2},
+        # provider -> base url override, e.g. a local stub replaying recorded responses
+        "base_urls": {},
+    }
+    ollama_base_url = "http://localhost:11434/v1"
+
+    def __init__(self, settings: Dict, llm_configs: Dict):
+        """Initialize the lazy mapping of model name -> instructor client.
+
+        Provider SDK clients are only imported and created when a model of that provider
+        is first used, and all of them share a single keep-alive HTTP connection pool.
+
+        Args:
+            settings (Dict): Junior settings (API keys under 'LLM', HTTP tuning under 'HTTP').
+            llm_configs (Dict): Known models configurations.
+        """
+        self.llm_configs = llm_configs
+        self.http_settings = {**self.http_defaults, **settings.get("HTTP", {})}
+        self.api_keys = self.provider_keys(settings)
+        self.models = self.available_models(settings)
+        self.instructors = {}
+        self._http_client = None
+        # async clients and semaphores are bound to the event loop that uses them
+        self.loops = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    @staticmethod
+    def provider_keys(settings: Dict) -> Dict[str, str]:
+        """Get the API key of each remote provider (settings keys may be 'OpenAI' or 'openai/gpt-4')."""
+        keys = {}
+        for name, api_key in settings.get("LLM", {}).get("remote", {}).items():
+            if api_key:
+                keys[name.split("/")[0].lower()] = api_key
+        return keys
+
+    def available_models(self, settings: Dict) -> list:
+        """Get the names of the models we have credentials or a local install for."""
+        local_llms = settings.get("LLM", {}).get("local", {})
+        models = []
+        for name, config in self.llm_configs.items():
+            provider = name.split("/")[0].lower()
+            if config["local"]:
+                if name in local_llms:
+                    models.append(name)
+            elif provider in self.api_keys:
+                models.append(name)
+        return models
+
+    def http_options(self) -> Dict:
+        """Get the httpx client options shared by the sync and async clients."""
+        http = self.http_settings
+        http2 = http["http2"]
+        if http2:
+            try:
+                import h2  # noqa: F401 (httpx needs it for HTTP/2)
+            except ImportError:
+                http2 = False
+        return {
+            "http2": http2,
+            "limits": httpx.Limits(
+                max_connections=http["pool_size"],
+                max_keepalive_connections=http["keepalive"],
+                keepalive_expiry=http["keepalive_expiry"],
+            ),
+            "timeout": httpx.Timeout(http["timeout"], connect=http["connect_timeout"]),
+        }
+
+    def http_client(self) -> httpx.Client:
+        """Get the shared HTTP client (created on first use)."""
+        if self._http_client is None:
+            self._http_client = httpx.Client(**self.http_options())
+        return self._http_client
+
+    def loop_state(self) -> Dict:
+        """Get the async clients and semaphores of the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self.loops:
+            self.loops[loop] = {"http_client": None, "instructors": {}, "semaphores": {}}
+        return self.loops[loop]
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        """Get the shared async HTTP client of the running event loop."""
+        state = self.loop_state()
+        if state["http_client"] is None:
+            state["http_client"] = httpx.AsyncClient(**self.http_options())
+        return state["http_client"]
+
+    def create_instructor(self, provider: str, use_async: bool = False) -> Any:
+        """Create the (sync or async) instructor client of a provider.
+
+        SDK retries are disabled (max_retries=0): Brain retries transient errors itself, with
+        jittered backoff and the provider circuit breakers.
+        """
+        import instructor
+        http_client = self.async_http_client() if use_async else self.http_client()
+        base_url = self.http_settings["base_urls"].get(provider)
+        options = {"base_url": base_url, "http_client": http_client, "max_retries": 0}
+        if provider in ("openai", "ollama"):
+            from openai import OpenAI, AsyncOpenAI
+            client_class = AsyncOpenAI if use_async else OpenAI
+            if provider == "ollama":
+                return instructor.from_openai(client_class(api_key="ollama", **{**options, "base_url": base_url or self.ollama_base_url}), mode=instructor.Mode.JSON)
+            client = client_class(api_key=self.api_keys[provider], **options)
+            self.keep_provider_usage(client.chat.completions, use_async)
+            return instructor.from_openai(client)
+        elif provider == "groq":
+            from groq import Groq, AsyncGroq
+            client_class = AsyncGroq if use_async else Groq
+            return instructor.from_groq(client_class(api_key=self.api_keys[provider], **options))
+        elif provider == "anthropic":
+            from anthropic import Anthropic, AsyncAnthropic
+            client_class = AsyncAnthropic if use_async else Anthropic
+            client = client_class(api_key=self.api_keys[provider], **options)
+            self.keep_provider_usage(client.messages, use_async)
+            return instructor.from_anthropic(client, mode=instructor.Mode.ANTHROPIC_JSON)
+        raise KeyError(f"Unknown provider '{provider}'")
+
+    @staticmethod
+    def keep_provider_usage(resource: Any, use_async: bool):
+        """Keep the usage reported by the provider on each response as 'provider_usage'.
+
+        instructor replaces 'usage' with its own total over its retries, which drops the prompt
+        caching fields (e.g. Anthropic's cache_read_input_tokens). Wraps 'resource.create', so it
+        must be called before the client is given to instructor.
+        """
+        create = resource.create
+
+        def keep(response):
+            if getattr(response, "usage", None) is not None:
+                response.provider_usage = response.usage
+            return response
+
+        if use_async:
+            async def create_keeping_usage(*args, **kwargs):
+                return keep(await create(*args, **kwargs))
+        else:
+            def create_keeping_usage(*args, **kwargs):
+                return keep(create(*args, **kwargs))
+        resource.create = functools.wraps(create)(create_keeping_usage)
+
+    def get_async(self, model_name: str) -> Any:
+        """Get the async instructor client of a model for the running event loop."""
+        if model_name not in self.models:
+            raise KeyError(model_name)
+        provider = model_name.split("/")[0].lower()
+        instructors = self.loop_state()["instructors"]
+        if provider not in instructors:
+            instructors[provider] = self.create_instructor(provider, use_async=True)
+        return instructors[provider]
+
+    def limit(self, model_name: str) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent requests to the provider of a model."""
+        provider = model_name.split("/")[0].lower()
+        semaphores = self.loop_state()["semaphores"]
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(self.http_settings["concurrency"].get(provider, 4))
+        return semaphores[provider]
+
+    def __getitem__(self, model_name: str) -> Any:
+        if model_name not in self.models:
+            raise KeyError(model_name)
+        provider = model_name.split("/")[0].lower()
+        with self.lock:
+            if provider not in self.instructors:
+                self.instructors[provider] = self.create_instructor(provider)
+            return self.instructors[provider]
+
+    def __contains__(self, model_name: object) -> bool:
+        return model_name in self.models
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def close(self):
+        """Close the shared (sync) HTTP connections."""
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+
+    async def aclose(self):
+        """Close the async HTTP connections of the running event loop."""
+        state = self.loop_state()
+        if state["http_client"] is not None:
+            await state["http_client"].aclose()
+            state["http_client"] = None
+            state["instructors"] = {}
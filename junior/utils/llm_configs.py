@@ -2,6 +2,7 @@ from junior.utils.system_helper import SystemInfo
 
 llm_configs = {
     "openai/gpt3.5": {
+        "model": "gpt-3.5-turbo",
         "context_window_tokens": 4096,
         "max_output_tokens": 1024,
         "expert_for": ["reasoning", "coding", "translating", "math"],
@@ -9,6 +10,7 @@ llm_configs = {
         "minimum_ram_required": None,  # Not required for remote models
         "minimum_gpu_required": None,  # Not required for remote models
         "required_disk_space": None,   # Not required for remote models
+        "price_per_million_tokens": {"input": 0.5, "output": 1.5},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -18,6 +20,7 @@ llm_configs = {
         "fallback": "openai/gpt3.5-turbo"
     },
     "openai/gpt3.5-turbo": {
+        "model": "gpt-3.5-turbo-0125",
         "context_window_tokens": 8192,
         "max_output_tokens": 4096,
         "expert_for": ["reasoning", "coding", "translating", "math"],
@@ -25,6 +28,7 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 0.5, "output": 1.5},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -34,6 +38,7 @@ llm_configs = {
         "fallback": "openai/gpt-4"
     },
     "openai/gpt-4": {
+        "model": "gpt-4",
         "context_window_tokens": 8192,
         "max_output_tokens": 4096,
         "expert_for": ["everything", "reasoning", "coding", "translating", "math"],
@@ -43,6 +48,7 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 30, "output": 60},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -52,6 +58,7 @@ llm_configs = {
         "fallback": None
     },
     "openai/gpt-4-vision": {
+        "model": "gpt-4-vision-preview",
         "context_window_tokens": 8192,
         "max_output_tokens": 4096,
         "expert_for": ["reasoning", "vision", "coding", "translating"],
@@ -59,6 +66,7 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 10, "output": 30},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -68,6 +76,7 @@ llm_configs = {
         "fallback": None
     },
     "anthropic/claude-1": {
+        "model": "claude-instant-1.2",
         "context_window_tokens": 100000,
         "max_output_tokens": 2048,
         "expert_for": ["reasoning", "coding", "translating", "math"],
@@ -75,15 +84,18 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 0.8, "output": 2.4},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
             "tokens_per_minute": 10000,
             "tokens_per_day": 1200000,
         },
+        "prompt_caching": False,  # cache_control breakpoints need a Claude 3 (or newer) model
         "fallback": "anthropic/claude-2"
     },
     "anthropic/claude-2": {
+        "model": "claude-2.1",
         "context_window_tokens": 100000,
         "max_output_tokens": 4096,
         "expert_for": ["reasoning", "coding", "translating", "math"],
@@ -91,14 +103,35 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 8, "output": 24},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
             "tokens_per_minute": 10000,
             "tokens_per_day": 1200000,
         },
+        "prompt_caching": False,  # cache_control breakpoints need a Claude 3 (or newer) model
         "fallback": None
     },
+    "anthropic/claude-3-5-sonnet": {
+        "model": "claude-3-5-sonnet-20240620",
+        "context_window_tokens": 200000,
+        "max_output_tokens": 4096,
+        "expert_for": ["reasoning", "coding", "translating", "math"],
+        "local": False,
+        "minimum_ram_required": None,
+        "minimum_gpu_required": None,
+        "required_disk_space": None,
+        "price_per_million_tokens": {"input": 3, "output": 15},  # USD
+        "limits": {
+            "requests_per_minute": 50,
+            "requests_per_day": 14400,
+            "tokens_per_minute": 40000,
+            "tokens_per_day": 1200000,
+        },
+        "prompt_caching": True,  # a cache_control breakpoint is sent after the stable context (see Brain.build_messages)
+        "fallback": "anthropic/claude-2"
+    },
     "groq/llama3-70b-8192": {
         "context_window_tokens": 8192,
         "max_output_tokens": 4096,
@@ -107,6 +140,7 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 0.59, "output": 0.79},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -124,6 +158,7 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 0.05, "output": 0.08},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -141,6 +176,7 @@ llm_configs = {
         "minimum_ram_required": None,
         "minimum_gpu_required": None,
         "required_disk_space": None,
+        "price_per_million_tokens": {"input": 0.24, "output": 0.24},  # USD
         "limits": {
             "requests_per_minute": 30,
             "requests_per_day": 14400,
@@ -158,6 +194,7 @@ llm_configs = {
         "minimum_ram_required": 16,  # GB
         "minimum_gpu_required": False,
         "required_disk_space": 4.1,  # GB
+        "price_per_million_tokens": {"input": 0, "output": 0},  # USD
         "limits": {
             "requests_per_minute": None,
             "requests_per_day": None,
@@ -174,6 +211,7 @@ llm_configs = {
         "minimum_ram_required": 16,  # GB
         "minimum_gpu_required": False,
         "required_disk_space": 4.7,  # GB
+        "price_per_million_tokens": {"input": 0, "output": 0},  # USD
         "limits": {
             "requests_per_minute": None,
             "requests_per_day": None,
@@ -190,6 +228,7 @@ llm_configs = {
         "minimum_ram_required": 16,  # GB
         "minimum_gpu_required": False,
         "required_disk_space": 2.3,  # GB
+        "price_per_million_tokens": {"input": 0, "output": 0},  # USD
         "limits": {
             "requests_per_minute": None,
             "requests_per_day": None,
@@ -1,14 +1,27 @@
 # localizer.py
-import os, polib, gettext
-from junior.utils.translator import TranslationService
+import os, sys, glob, polib, gettext, atexit, threading
+from junior.utils.translator import TranslationService, default_languages
 
 class Localizer:
-    def __init__(self, locale_path='translations', domain='messages', cache_dir=None, cache_ttl=3600, target_lang='en', online=True):
+    def __init__(self, locale_path='translations', domain='messages', cache_dir=None, cache_ttl=30 * 24 * 3600, target_lang='en', online=True, languages=default_languages):
         self.locale_path = locale_path
         self.domain = domain
-        self.translator = TranslationService(cache_dir=cache_dir, cache_ttl=cache_ttl)
+        self.translator = TranslationService(cache_dir=cache_dir, cache_ttl=cache_ttl, languages=languages)
         self.target_lang = target_lang
         self.online = online
+        # .po files are parsed once per language into msgid -> msgstr dicts
+        self.catalogs = {}
+        # new translations, written to the .po files at exit: language -> {msgid: (msgstr, method)}
+        self.pending = {}
+        # texts already sent to the translator in this process, even if it returned them unchanged
+        self.attempted = set()
+        self.lock = threading.RLock()
+        # incremented whenever a catalog changes, so callers can invalidate what they derived from it
+        self.version = 0
+        # running prefetches: language -> (thread, msgids being translated)
+        self.prefetching = {}
+        self.prefetch_wait = 10
+        atexit.register(self.flush)
 
         # Configure gettext
         gettext.bindtextdomain(domain, locale_path)
@@ -20,7 +33,12 @@ class Localizer:
         translated_text = self.searchTranslation(text)
         #print(f"Translated text: {translated_text}",text)
 
-        if not translated_text or translated_text == text: # No translation found in .mo files
+        # No translation found (texts the translator returned unchanged are retried once per process)
+        if not translated_text and self.wait_for_prefetch(text):
+            translated_text = self.searchTranslation(text)
+
+        if not translated_text or (translated_text == text and (self.target_lang, text) not in self.attempted):
+            self.attempted.add((self.target_lang, text))
             #print(f"Translating text: {text} to '{self.target_lang}'")
             translated_text = self.translator.translate(text, target_lang=self.target_lang, online=self.online)
             #print(f"!!Translated text: {translated_text}")
@@ -34,17 +52,19 @@ class Localizer:
         if not args and not kwargs:
             # Translate the modified text
             return self.translate(text)
-        
+
+        return self.translate_template(text, kwargs).format(*args, **kwargs)
+
+    def translate_template(self, text, placeholders):
+        """Translate a template, keeping its named placeholders intact (without formatting it)."""
         # Temporarily replace placeholders with unique identifiers
-        temp_text, unique_to_placeholder = self._replace_placeholders_with_unique(text, **kwargs)
+        temp_text, unique_to_placeholder = self._replace_placeholders_with_unique(text, **placeholders)
         
         # Translate the modified text
         translated_temp_text = self.translate(temp_text)
         
         # Restore original placeholders
-        translated_text = self._restore_placeholders(translated_temp_text, unique_to_placeholder)
-        
-        return translated_text.format(*args, **kwargs)
+        return self._restore_placeholders(translated_temp_text, unique_to_placeholder)
 
     def _replace_placeholders_with_unique(self, text, **kwargs):
         """Replace placeholders with unique identifiers."""
@@ -62,22 +82,105 @@ class Localizer:
             text = text.replace(unique_key, placeholder)
         return text
 
-    def searchTranslation(self, text):
-        """Search for a translation in the .po file."""
-        po_dir = os.path.join(self.locale_path, self.target_lang, 'LC_MESSAGES')
-        po_file_path = os.path.join(po_dir, f'{self.domain}.po')
+    def po_file_path(self, target_lang):
+        """Get the path of the .po file of a language."""
+        return os.path.join(self.locale_path, target_lang, 'LC_MESSAGES', f'{self.domain}.po')
+
+    def catalog(self, target_lang):
+        """Get the translations of a language, parsing its .po file on first use."""
+        with self.lock:
+            if target_lang not in self.catalogs:
+                catalog = {}
+                po_file_path = self.po_file_path(target_lang)
+                if os.path.exists(po_file_path):
+                    try:
+                        catalog = {entry.msgid: entry.msgstr for entry in polib.pofile(po_file_path) if entry.msgstr and not entry.obsolete}
+                    except (IOError, ValueError) as e:
+                        print(f"Error reading .po file: {e}", file=sys.stderr)
+                self.catalogs[target_lang] = catalog
+            return self.catalogs[target_lang]
+
+    def known_msgids(self):
+        """Get the msgids of this domain in the .po files of every language."""
+        msgids = set()
+        for po_file_path in glob.glob(os.path.join(self.locale_path, '*', 'LC_MESSAGES', f'{self.domain}.po')):
+            try:
+                msgids.update(entry.msgid for entry in polib.pofile(po_file_path) if entry.msgid and not entry.obsolete)
+            except (IOError, ValueError):
+                continue
+        return msgids
+
+    def prefetch(self, target_lang=None, background=True):
+        """Translate every known msgid missing from the catalog of a language, in a few batched requests.
+
+        Args:
+            target_lang (str, optional): Language to prefetch. Defaults to the target language.
+            background (bool, optional): Run in a daemon thread. Defaults to True.
+
+        Returns:
+            threading.Thread: The background thread, if any.
+        """
+        target_lang = target_lang or self.target_lang
+        # msgids are the english source strings
+        if target_lang == 'en' or target_lang in self.prefetching or not self.online:
+            return None
+        catalog = self.catalog(target_lang)
+        missing = sorted(msgid for msgid in self.known_msgids() if msgid not in catalog)
+        if not missing:
+            return None
+
+        def run():
+            try:
+                translations = self.translator.translate_batch(missing, target_lang=target_lang, source_lang='en')
+                for msgid, translation in zip(missing, translations):
+                    if translation != msgid:
+                        self.update_po_file(msgid, translation, target_lang, "Batch Online")
+            finally:
+                self.prefetching.pop(target_lang, None)
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name=f"prefetch-{self.domain}-{target_lang}", daemon=True)
+        self.prefetching[target_lang] = (thread, set(missing))
+        thread.start()
+        return thread
+
+    def wait_for_prefetch(self, text):
+        """Wait (up to prefetch_wait seconds) for a running prefetch that includes the text, instead of translating it alone."""
+        prefetch = self.prefetching.get(self.target_lang)
+        if not prefetch or text not in prefetch[1]:
+            return False
+        prefetch[0].join(timeout=self.prefetch_wait)
+        return True
 
-        if os.path.exists(po_file_path):
-            po = polib.pofile(po_file_path)
-            entry = po.find(text)
-            if entry:
-                return entry.msgstr
-        return None
+    def searchTranslation(self, text):
+        """Search for a translation in the (in-memory) catalog of the target language."""
+        return self.catalog(self.target_lang).get(text)
 
     def update_po_file(self, original_text, translation, target_lang, method):
-        """Update the .po file with the original placeholders intact."""
-        po_dir = os.path.join(self.locale_path, target_lang, 'LC_MESSAGES')
-        po_file_path = os.path.join(po_dir, f'{self.domain}.po')
+        """Add a translation to the catalog; it's written to the .po file by flush (at exit)."""
+        with self.lock:
+            self.catalog(target_lang)[original_text] = translation
+            self.version += 1
+            self.pending.setdefault(target_lang, {})[original_text] = (translation, method)
+
+    def flush(self):
+        """Write the buffered translations into their .po files (once per file)."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for target_lang, entries in pending.items():
+            self.save_po_file(target_lang, entries)
+
+    def save_po_file(self, target_lang, entries):
+        """Update the .po file of a language with new entries, keeping the original placeholders intact.
+
+        Args:
+            target_lang (str): Language of the .po file.
+            entries (dict): msgid -> (msgstr, translation method).
+        """
+        po_file_path = self.po_file_path(target_lang)
+        po_dir = os.path.dirname(po_file_path)
         #mo_file_path = os.path.join(po_dir, f'{self.domain}.mo')
 
         # Ensure the directory exists
@@ -102,22 +205,27 @@ class Localizer:
                     'Language': target_lang,
                 }
 
-            # Find or create the entry
-            entry = po.find(original_text)
-            if entry is None:
-                entry = polib.POEntry(msgid=original_text, msgstr=translation)
-                po.append(entry)
-            else:
-                entry.msgstr = translation
-
-            # Add translation method as a comment
-            entry.comment = f'Translated using {method} translation.'
-
-            # Save the updated .po file
-            po.save(po_file_path)
+            existing = {entry.msgid: entry for entry in po}
+            for original_text, (translation, method) in entries.items():
+                # Find or create the entry
+                entry = existing.get(original_text)
+                if entry is None:
+                    entry = polib.POEntry(msgid=original_text, msgstr=translation)
+                    po.append(entry)
+                    existing[original_text] = entry
+                else:
+                    entry.msgstr = translation
+
+                # Add translation method as a comment
+                entry.comment = f'Translated using {method} translation.'
+
+            # Save the updated .po file atomically, so an interrupted write never truncates it
+            tmp_file_path = f'{po_file_path}.tmp'
+            po.save(tmp_file_path)
+            os.replace(tmp_file_path, po_file_path)
 
             # Compile to .mo file
             #po.save_as_mofile(mo_file_path)
 
         except Exception as e:
-            print(f"Error updating .po or .mo files: {e}")
+            print(f"Error updating .po or .mo files: {e}", file=sys.stderr)
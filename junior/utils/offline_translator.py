@@ -0,0 +1,149 @@
+# offline_translator.py
+import os, re, sys, atexit, importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Hugging Face ids of the offline models, by name
+offline_models = {
+    'opus-mt': 'Helsinki-NLP/opus-mt-{source}-{target}',
+}
+
+# models loaded in the current worker process: model id -> (tokenizer, model)
+_worker_models = {}
+
+def _init_worker(threads):
+    """Limit the torch threads of a worker, so parallel workers don't compete for the same cores."""
+    import torch
+    torch.set_num_threads(threads)
+
+def _translate_batch(model_id, sentences, local_only):
+    """Translate a batch of sentences inside a worker process, loading the model on first use.
+
+    Returns None when the model isn't available (not downloaded, or not published for the language pair).
+    """
+    if model_id not in _worker_models:
+        from transformers import MarianMTModel, MarianTokenizer
+        try:
+            tokenizer = MarianTokenizer.from_pretrained(model_id, local_files_only=local_only)
+            model = MarianMTModel.from_pretrained(model_id, local_files_only=local_only)
+        except OSError:
+            # transformers raises OSError for models missing locally or on the hub
+            return None
+        model.eval()
+        _worker_models[model_id] = (tokenizer, model)
+    import torch
+    tokenizer, model = _worker_models[model_id]
+    with torch.no_grad():
+        inputs = tokenizer(sentences, return_tensors='pt', padding=True, truncation=True)
+        outputs = model.generate(**inputs)
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+def split_sentences(text):
+    """Split a text into (sentence, separator) pairs; joining them back gives the original layout."""
+    parts = re.split(r'((?<=[.!?])\s+|\n+)', text)
+    pairs = []
+    for index in range(0, len(parts), 2):
+        separator = parts[index + 1] if index + 1 < len(parts) else ''
+        pairs.append((parts[index], separator))
+    return pairs
+
+class OfflineTranslator:
+    def __init__(self, model='opus-mt', workers=None, batch_size=16, local_only=True):
+        """Initialize the offline (CPU) translator; models load lazily inside persistent worker processes.
+
+        Args:
+            model (str, optional): Name in offline_models or a model id template with {source} and {target}. Defaults to 'opus-mt'.
+            workers (int, optional): Worker processes. Defaults to half the cores (at most 4).
+            batch_size (int, optional): Sentences translated per model call. Defaults to 16.
+            local_only (bool, optional): Only use models already downloaded (e.g. on air-gapped machines). Defaults to True.
+        """
+        cores = os.cpu_count() or 1
+        self.model_template = offline_models.get(model, model)
+        self.workers = workers or max(1, min(4, cores // 2))
+        self.threads = max(1, cores // self.workers)
+        self.batch_size = batch_size
+        self.local_only = local_only
+        self.pool = None
+        # language pairs without a usable model
+        self.unavailable = set()
+        atexit.register(self.close)
+
+    @staticmethod
+    def is_installed():
+        """Check if the offline translation dependencies (transformers, torch, sentencepiece) are installed."""
+        return all(importlib.util.find_spec(name) is not None for name in ('transformers', 'torch', 'sentencepiece'))
+
+    def executor(self):
+        """Get the worker pool, starting it on first use."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.threads,))
+        return self.pool
+
+    def close(self):
+        """Stop the worker processes."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def run_batches(self, model_id, batches):
+        """Translate batches of sentences on the workers, rebuilding the pool once if a worker died.
+
+        Returns:
+            list: The translations of each batch (None for batches whose model isn't available).
+        """
+        for attempt in range(2):
+            try:
+                futures = [self.executor().submit(_translate_batch, model_id, batch, self.local_only) for batch in batches]
+                return [future.result() for future in futures]
+            except BrokenProcessPool:
+                # e.g. a worker killed for using too much memory: start new workers
+                self.close()
+                if attempt:
+                    raise
+
+    def translate(self, texts, source_lang, target_lang):
+        """Translate texts sentence by sentence, spreading batches of sentences across the workers.
+
+        Args:
+            texts (list): Texts to translate.
+            source_lang (str): ISO 639-1 code of the language of the texts.
+            target_lang (str): ISO 639-1 code of the language to translate to.
+
+        Returns:
+            list: The translations, or None when no model is available for the language pair.
+        """
+        pair = (source_lang, target_lang)
+        if pair in self.unavailable or not self.is_installed():
+            return None
+        model_id = self.model_template.format(source=source_lang, target=target_lang)
+
+        split_texts = [split_sentences(text) for text in texts]
+        # every distinct sentence is translated once
+        sentences = list(dict.fromkeys(sentence.strip() for pairs in split_texts for sentence, _ in pairs if sentence.strip()))
+        batches = [sentences[start:start + self.batch_size] for start in range(0, len(sentences), self.batch_size)]
+        try:
+            results = self.run_batches(model_id, batches)
+        except Exception as e:
+            # e.g. workers that keep dying; the model may still work later
+            print(f"Offline translation with {model_id} failed: {e}", file=sys.stderr)
+            return None
+        if any(result is None for result in results):
+            print(f"Offline translation model {model_id} not available.", file=sys.stderr)
+            self.unavailable.add(pair)
+            return None
+        translated = {}
+        for batch, result in zip(batches, results):
+            translated.update(zip(batch, result))
+
+        results = []
+        for pairs in split_texts:
+            results.append(''.join(
+                (sentence.replace(sentence.strip(), translated[sentence.strip()]) if sentence.strip() else sentence) + separator
+                for sentence, separator in pairs
+            ))
+        return results
+
+# Example Usage
+if __name__ == "__main__":
+    translator = OfflineTranslator(local_only=False)
+    print(translator.translate(["Hello world. How are you?", "Select the model to use"], 'en', 'es'))
@@ -0,0 +1,174 @@
+import json, threading, time
+from typing import Callable, Dict, List, Optional
+import httpx
+from junior.utils.system_helper import SystemInfo
+from junior.utils.resilience import backoff_delay
+
+class OllamaHelper:
+    def __init__(self, base_url: str = "http://localhost:11434", keep_alive: str = "30m"):
+        """Initialize the helper for the Ollama HTTP API.
+
+        Args:
+            base_url (str, optional): Ollama server url. Defaults to "http://localhost:11434".
+            keep_alive (str, optional): How long warmed models stay loaded. Defaults to "30m".
+        """
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.client = httpx.Client(base_url=self.base_url, timeout=httpx.Timeout(300, connect=2))
+
+    def is_ready(self) -> bool:
+        """Check if the Ollama API answers."""
+        try:
+            return self.client.get("/api/version", timeout=2).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def wait_until_ready(self, timeout: float = 60, initial_delay: float = 0.1, max_delay: float = 2) -> bool:
+        """Probe the Ollama API with exponential backoff until it answers.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait. Defaults to 60.
+            initial_delay (float, optional): First delay between probes. Defaults to 0.1.
+            max_delay (float, optional): Maximum delay between probes. Defaults to 2.
+
+        Returns:
+            bool: True if the server is ready, False if it timed out.
+        """
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        while True:
+            if self.is_ready():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+    def installed_models(self) -> Optional[List[str]]:
+        """Get the names of the installed models (None when the server doesn't answer)."""
+        try:
+            return [item["name"] for item in self.client.get("/api/tags", timeout=2).json().get("models", [])]
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    @staticmethod
+    def is_installed(model: str, installed: List[str]) -> bool:
+        """Check if a model is in a list of installed models ('llama3' matches 'llama3:latest')."""
+        return model in installed or (":" not in model and f"{model}:latest" in installed)
+
+    def pull(self, model: str, on_progress: Optional[Callable[[int, int, str], None]] = None, attempts: int = 3) -> bool:
+        """Download a model, reporting the exact bytes downloaded across all of its layers.
+
+        Interrupted downloads are retried; Ollama keeps the partial layers, so a retry
+        resumes where the previous attempt stopped.
+
+        Args:
+            model (str): Model to download (e.g. 'llama3').
+            on_progress (Callable, optional): Called with (completed bytes, total bytes, status) on every update. Defaults to None.
+            attempts (int, optional): Tries before giving up. Defaults to 3.
+
+        Returns:
+            bool: True when the model was downloaded.
+        """
+        for attempt in range(attempts):
+            layers = {}  # digest -> [completed, total]
+            try:
+                with self.client.stream("POST", "/api/pull", json={"model": model, "name": model, "stream": True}, timeout=httpx.Timeout(None, connect=5)) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if not line.strip():
+                            continue
+                        update = json.loads(line)
+                        if "error" in update:
+                            raise RuntimeError(update["error"])
+                        status = update.get("status", "")
+                        if update.get("digest") and update.get("total"):
+                            layers[update["digest"]] = [update.get("completed", 0), update["total"]]
+                        if on_progress:
+                            on_progress(sum(layer[0] for layer in layers.values()), sum(layer[1] for layer in layers.values()), status)
+                        if status == "success":
+                            return True
+            except (httpx.HTTPError, ValueError, RuntimeError) as e:
+                if attempt + 1 >= attempts:
+                    raise
+                if on_progress:
+                    on_progress(sum(layer[0] for layer in layers.values()), sum(layer[1] for layer in layers.values()), f"retrying ({e})")
+                time.sleep(backoff_delay(attempt, base_delay=1, max_delay=10))
+        return False
+
+    def loaded_models(self) -> List[Dict]:
+        """Get the models currently loaded in memory (name, size, expires_at)."""
+        try:
+            return self.client.get("/api/ps").json().get("models", [])
+        except (httpx.HTTPError, ValueError):
+            return []
+
+    def load(self, model: str, keep_alive: Optional[str] = None) -> bool:
+        """Load a model into memory with an empty generate request (it answers once loaded)."""
+        try:
+            response = self.client.post("/api/generate", json={"model": model, "prompt": "", "keep_alive": keep_alive or self.keep_alive})
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def evict(self, model: str) -> bool:
+        """Unload a model from memory."""
+        try:
+            return self.client.post("/api/generate", json={"model": model, "keep_alive": 0}).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def plan_prewarm(self, models: Dict[str, float], available_gb: Optional[float] = None) -> Dict:
+        """Decide which models fit in the available RAM.
+
+        Args:
+            models (Dict[str, float]): Model -> approximate memory needed in GB, in order of preference.
+            available_gb (float, optional): Available RAM in GB. Defaults to the current available memory.
+
+        Returns:
+            Dict: {"warm": [models to load], "skip": [models that don't fit], "evict": [other loaded models to unload]}
+        """
+        if available_gb is None:
+            available_gb = SystemInfo.get_memory_info()["available"]
+        loaded = {item["name"]: item.get("size", 0) / 1024**3 for item in self.loaded_models()}
+        # already loaded models don't need more memory
+        budget = available_gb
+        warm, skip = [], []
+        for model, required_gb in models.items():
+            if model in loaded:
+                warm.append(model)
+            elif required_gb <= budget:
+                warm.append(model)
+                budget -= required_gb
+            else:
+                skip.append(model)
+        # when RAM is tight, models we don't use are the first to go
+        evict = [model for model in loaded if model not in models] if skip else []
+        return {"warm": warm, "skip": skip, "evict": evict}
+
+    def prewarm(self, models: Dict[str, float], background: bool = True) -> Optional[threading.Thread]:
+        """Load the given models (as many as fit in RAM) so that the first real request doesn't pay the load time.
+
+        Args:
+            models (Dict[str, float]): Model -> approximate memory needed in GB, in order of preference.
+            background (bool, optional): Run in a daemon thread. Defaults to True.
+
+        Returns:
+            Optional[threading.Thread]: The background thread, if any.
+        """
+        def run():
+            plan = self.plan_prewarm(models)
+            for model in plan["evict"]:
+                self.evict(model)
+            # with a tight memory budget keep models loaded only for a short while
+            keep_alive = "5m" if plan["skip"] else self.keep_alive
+            for model in plan["warm"]:
+                self.load(model, keep_alive=keep_alive)
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="ollama-prewarm", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Iterator, Optional
+from rich.console import Console
+from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn, TimeElapsedColumn
+from rich.spinner import SPINNERS
+
+def iterate(task: Any) -> Iterator:
+    """Iterate a task from sync code, whatever its kind.
+
+    Args:
+        task (Any): A generator or async generator, or a function returning one.
+
+    Yields:
+        Any: The updates of the task.
+    """
+    if callable(task):
+        task = task()
+    if not hasattr(task, "__aiter__"):
+        yield from task
+        return
+    # async generators run on a private event loop of the consuming thread
+    loop = asyncio.new_event_loop()
+    iterator = task.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(iterator, "aclose"):
+            loop.run_until_complete(iterator.aclose())
+        loop.close()
+
+class ProgressRenderer:
+    def __init__(self, console: Optional[Console] = None, refresh_per_second: float = 10, spinner: Optional[Any] = None):
+        """Initialize a progress display of one or more concurrent tasks.
+
+        Updates only change the state of a task; the display is redrawn from a background
+        thread at a fixed rate, so producers never wait for the terminal and bursts of updates
+        are coalesced into one frame.
+
+        Args:
+            console (Console, optional): Rich console to draw on. Defaults to a new console.
+            refresh_per_second (float, optional): Redraws per second. Defaults to 10.
+            spinner (Any, optional): yaspin Spinner (frames and interval in ms) to use. Defaults to rich 'dots'.
+        """
+        spinner_name = "dots"
+        if spinner is not None:
+            spinner_name = "junior"
+            SPINNERS[spinner_name] = {"interval": spinner.interval, "frames": list(spinner.frames)}
+        self.progress = Progress(
+            SpinnerColumn(spinner_name, finished_text=""),
+            TextColumn("{task.description}"),
+            BarColumn(bar_width=20),
+            TaskProgressColumn(),
+            TimeElapsedColumn(),
+            console=console,
+            refresh_per_second=refresh_per_second,
+        )
+
+    def __enter__(self):
+        self.progress.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.progress.stop()
+        return False
+
+    def add(self, description: str, total: Optional[float] = None) -> int:
+        """Add a task (without a total its bar stays indeterminate) and get its id."""
+        return self.progress.add_task(description, total=total)
+
+    def update(self, task_id: int, description: Optional[str] = None, completed: Optional[float] = None, total: Optional[float] = None):
+        """Update the state of a task; it shows on the next redraw."""
+        fields = {}
+        if description is not None:
+            fields["description"] = description
+        if total is not None:
+            fields["total"] = total
+        if completed is not None:
+            fields["completed"] = completed
+        self.progress.update(task_id, **fields)
+
+    def finish(self, task_id: int, description: str, ok: bool = True):
+        """Mark a task as finished (completing its bar when it succeeded)."""
+        task = next(task for task in self.progress.tasks if task.id == task_id)
+        if ok:
+            self.progress.update(task_id, description=description, total=task.total or 1, completed=task.total or 1)
+        else:
+            self.progress.update(task_id, description=description)
+        self.progress.stop_task(task_id)
@@ -0,0 +1,111 @@
+import random, time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# exceptions (by class name) of the OpenAI, Groq and Anthropic SDKs and httpx worth retrying
+transient_errors = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout", "RemoteProtocolError",
+}
+
+def is_transient(error: BaseException) -> bool:
+    """Check if an error is worth retrying (rate limits, overloads, server errors, timeouts, connection drops)."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in (408, 409, 429) or status_code >= 500
+    return any(cls.__name__ in transient_errors for cls in type(error).__mro__)
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Get the seconds to wait requested by the provider (Retry-After / retry-after-ms headers), if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Check if an error says the provider (rather than the request) is failing, i.e. if it counts for its circuit breaker."""
+    return is_transient(error) or getattr(error, "status_code", None) in (401, 403)
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 20, error: Optional[BaseException] = None) -> float:
+    """Seconds to wait before a retry: the provider's Retry-After when given, else exponential backoff with full jitter.
+
+    Retry-After is returned as is (it can exceed max_delay), so callers can fall back
+    to another model instead of waiting that long.
+
+    Args:
+        attempt (int): Number of the failed attempt (starting at 0).
+        base_delay (float, optional): Delay of the first retry. Defaults to 0.5.
+        max_delay (float, optional): Maximum backoff delay. Defaults to 20.
+        error (BaseException, optional): The error that caused the retry. Defaults to None.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    requested = retry_after(error) if error is not None else None
+    if requested is not None:
+        return requested
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """Initialize a circuit breaker for a provider.
+
+        After 'failure_threshold' consecutive failures the breaker opens and calls are skipped.
+        Once 'reset_timeout' seconds passed a single trial call is allowed (half open): a success
+        closes the breaker again, a failure opens it for another 'reset_timeout'.
+
+        Args:
+            failure_threshold (int, optional): Consecutive failures that open the breaker. Defaults to 5.
+            reset_timeout (float, optional): Seconds to stay open before a trial call. Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        """Get the state: 'closed', 'open' or 'half_open'."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Check (without side effects) if a call may go through."""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_running)
+
+    def before_call(self):
+        """Mark the start of a call (used to allow a single trial call while half open)."""
+        if self.state == "half_open":
+            self.trial_running = True
+
+    def record_success(self):
+        """Record a successful call."""
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def cancel_call(self):
+        """Record a call that ended without an outcome (e.g. cancelled), so a new trial call can be made."""
+        self.trial_running = False
+
+    def record_failure(self):
+        """Record a failed call."""
+        self.failures += 1
+        if self.trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial_running = False
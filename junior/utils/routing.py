@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+class ScoringPolicy(ABC):
+    """Base class of the policies used by Brain.choose_best_model to rank candidate models."""
+    name = "base"
+
+    @abstractmethod
+    def score(self, candidate: Dict) -> Dict:
+        """Score a candidate model.
+
+        Args:
+            candidate (Dict): name, config, tokens (prompt), category, headroom (TokenTracker),
+                and ewma (Telemetry: latency_s, tokens_per_second, error_rate) of the model.
+
+        Returns:
+            Dict: {"score": float, "components": {name: value}}; the highest score wins.
+        """
+
+    def rank(self, candidates: List[Dict]) -> List[Dict]:
+        """Score every candidate, best first (ties are broken by name, so ranking is stable)."""
+        explained = []
+        for candidate in candidates:
+            result = self.score(candidate)
+            explained.append({"name": candidate["name"], "score": result["score"], "components": result["components"]})
+        return sorted(explained, key=lambda item: (-item["score"], item["name"]))
+
+class WindowPolicy(ScoringPolicy):
+    """Original policy: prefer the model with the most context window left."""
+    name = "window"
+
+    def score(self, candidate: Dict) -> Dict:
+        remaining = candidate["config"]["context_window_tokens"] - candidate["tokens"]
+        return {"score": float(remaining), "components": {"remaining_window": remaining}}
+
+class BalancedPolicy(ScoringPolicy):
+    """Weighted mix of live latency, throughput, error rate, price, category fit and rate-limit headroom.
+
+    Every component is normalized into 0..1 (higher is better) before weighting. In deterministic
+    mode the live signals (telemetry and headroom) are replaced by neutral values, so the choice
+    only depends on llm_configs and the prompt.
+    """
+    name = "balanced"
+    default_weights = {
+        "latency": 2.0,
+        "throughput": 1.0,
+        "errors": 2.0,
+        "cost": 2.0,
+        "fit": 1.0,
+        "headroom": 1.0,
+        "window": 0.5,
+    }
+    reference_latency = 5.0        # seconds
+    reference_throughput = 50.0    # tokens per second
+    reference_cost = 0.01          # USD per request
+    expected_output_tokens = 500
+
+    def __init__(self, weights: Optional[Dict] = None, deterministic: bool = False):
+        """Initialize the policy.
+
+        Args:
+            weights (Dict, optional): Overrides of default_weights. Defaults to None.
+            deterministic (bool, optional): Ignore live telemetry and rate-limit usage. Defaults to False.
+        """
+        self.weights = {**self.default_weights, **(weights or {})}
+        self.deterministic = deterministic
+
+    def estimated_cost(self, candidate: Dict) -> float:
+        """Estimated USD cost of the request on a candidate model."""
+        config = candidate["config"]
+        price = config.get("price_per_million_tokens") or {"input": 0, "output": 0}
+        output_tokens = min(self.expected_output_tokens, config["max_output_tokens"])
+        return (candidate["tokens"] * price["input"] + output_tokens * price["output"]) / 1_000_000
+
+    def components(self, candidate: Dict) -> Dict:
+        """Get the normalized (0..1, higher is better) components of a candidate."""
+        config = candidate["config"]
+        expert_for = config["expert_for"]
+        category = candidate["category"]
+        ewma = {} if self.deterministic else candidate.get("ewma", {})
+        latency = ewma.get("latency_s")
+        throughput = ewma.get("tokens_per_second")
+        error_rate = ewma.get("error_rate")
+
+        headroom = 1.0
+        if not self.deterministic:
+            for key, limit in config["limits"].items():
+                remaining = candidate.get("headroom", {}).get(key)
+                if limit and remaining is not None:
+                    headroom = min(headroom, max(0.0, remaining / limit))
+
+        return {
+            # unknown live values are neutral
+            "latency": 0.5 if latency is None else 1 / (1 + latency / self.reference_latency),
+            "throughput": 0.5 if throughput is None else throughput / (throughput + self.reference_throughput),
+            "errors": 1.0 if error_rate is None else 1 - error_rate,
+            "cost": 1 / (1 + self.estimated_cost(candidate) / self.reference_cost),
+            # models listing the category earlier in 'expert_for' fit best
+            "fit": 0.0 if category not in expert_for else 1 - expert_for.index(category) / (2 * len(expert_for)),
+            "headroom": headroom,
+            "window": 1 - candidate["tokens"] / config["context_window_tokens"],
+        }
+
+    def score(self, candidate: Dict) -> Dict:
+        components = self.components(candidate)
+        score = sum(self.weights.get(name, 0) * value for name, value in components.items())
+        return {"score": round(score, 6), "components": {name: round(value, 4) for name, value in components.items()}}
+
+routing_policies = {
+    "window": WindowPolicy,
+    "balanced": BalancedPolicy,
+}
+
+def create_policy(settings: Dict) -> ScoringPolicy:
+    """Create the scoring policy configured under the 'ROUTING' key of the settings.
+
+    Example: {"ROUTING": {"policy": "balanced", "deterministic": false, "weights": {"cost": 4}}}
+
+    Raises:
+        ValueError: The configured policy is unknown.
+    """
+    routing = settings.get("ROUTING", {})
+    policy = routing.get("policy", "balanced")
+    if policy not in routing_policies:
+        raise ValueError(f"Unknown routing policy '{policy}' in the 'ROUTING' settings; valid policies: {', '.join(sorted(routing_policies))}")
+    if policy == "balanced":
+        return BalancedPolicy(weights=routing.get("weights"), deterministic=routing.get("deterministic", False))
+    return routing_policies[policy]()
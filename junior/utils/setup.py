@@ -1,30 +1,61 @@
-import os, time
+import os, time, hashlib, threading, contextlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 import json
 #import click
 from junior.utils.storage import EncryptedJSONStorage
 from junior.utils.system_helper import SystemInfo
 from junior.utils.docker_helper import DockerHelper
 from junior.utils.llm_configs import llm_configs
+from junior.utils.ollama_helper import OllamaHelper
 from junior.cli_manager import CLIManager
+from junior.utils.tracing import traced
 click = CLIManager(domain="setup")
 class Setup:
+    # shared by every Setup of the process: whether check_llm_settings ran, and whether ensure_llm_settings did
+    llm_checked = False
+    llm_ensured = False
+    llm_lock = threading.Lock()
+
+    @traced("setup.init")
     def __init__(self, language="en"):
         """Initialize the Setup class."""
         self.home_settings_path = Path.home() / ".junior" / "settings.json"
         self.local_settings_path = Path.cwd() / ".junior.json"
+        self.fingerprint_path = Path.home() / ".junior" / "setup_fingerprint.json"
         self.encrypted_storage = EncryptedJSONStorage(str(self.home_settings_path))
         self.system = SystemInfo()
         self.docker_image_ollama = "ollama/ollama"
         self.local_container_name = "ollama_server"
+        self.ollama_port = 11434
         click.setup_language(language=language)
         self.llm_configs = llm_configs
-        self.settings = self.load_settings()
-        self.docker_helper = DockerHelper()
-        if self.docker_helper.is_docker_running == False:
-            click.warn_("Docker is not running. Please start Docker and rerun 'junior' if you want to use local LLMs.")
+        # settings (decryption) and the Docker client (daemon ping) are only loaded when first needed
+        self._settings = None
+        self._docker_helper = None
+
+    @property
+    def settings(self) -> Dict:
+        """Get the settings, loading (and decrypting) them on first use."""
+        if self._settings is None:
+            self._settings = self.load_settings()
+        return self._settings
+
+    @settings.setter
+    def settings(self, value: Dict):
+        self._settings = value
+
+    @property
+    def docker_helper(self) -> DockerHelper:
+        """Get the Docker helper, connecting to the Docker daemon on first use."""
+        if self._docker_helper is None:
+            self._docker_helper = DockerHelper()
+            if self._docker_helper.is_docker_running == False:
+                click.warn_("Docker is not running. Please start Docker and rerun 'junior' if you want to use local LLMs.")
+        return self._docker_helper
 
+    @traced("setup.load_settings")
     def load_settings(self) -> Dict:
         """Load settings from home or local files."""
         if self.home_settings_path.exists():
@@ -39,6 +70,7 @@ class Setup:
 
         return settings
 
+    @traced("setup.save_settings")
     def save_settings(self, path=None):
         """Save settings to the specified path."""
         if not path:
@@ -58,6 +90,7 @@ class Setup:
             click.echo("Docker is not running. Please start Docker and rerun 'junior'.")
             exit(1)
 
+    @traced("setup.check_llm_settings")
     def check_llm_settings(self):
         """Check and configure LLM settings."""
         # remove 'local' models if Docker is not running
@@ -106,48 +139,48 @@ class Setup:
         if "LLM" not in self.settings:
             click.echo("At least one LLM API key is required.")
             exit(1)
+        Setup.llm_checked = True
+
+    @traced("setup.ensure_llm_settings")
+    def ensure_llm_settings(self):
+        """Check the LLM settings once per process, before the first model call (e.g. by Brain).
+
+        A warm start skips check_llm_settings, so this runs it when no LLM is configured, or when
+        it didn't run on a changed setup (e.g. Brain used without the CLI), asking for keys if
+        none are left. Settings entered by the user are saved. No network calls are made for
+        remote keys: a revoked one shows up as a provider failure on its first call.
+        """
+        with Setup.llm_lock:
+            if Setup.llm_ensured:
+                return
+            if not self.settings.get("LLM") or not (Setup.llm_checked or self.is_warm()):
+                before = json.dumps(self.settings.get("LLM"), sort_keys=True)
+                self.check_llm_settings()
+                if json.dumps(self.settings.get("LLM"), sort_keys=True) != before:
+                    self.save_settings()
+                    self.save_fingerprint()
+            Setup.llm_ensured = True
 
     def local_llm_models_installed(self):
-        """Check which local LLM models are installed."""
+        """Check which local LLM models are installed (a single inventory query)."""
+        installed = OllamaHelper(base_url=f"http://localhost:{self.ollama_port}").installed_models()
+        if installed is not None:
+            return installed
+        # API not reachable: ask the Ollama CLI inside the container
         query = self.docker_helper.execute_command(f"ollama list")
         # Splitting the query into lines
         lines = query.strip().split('\n')
         # Extract the model names from each line, except the header
         model_names = []
         for line in lines[1:]:  # Start from 1 to skip the header
-            model_name = line.split()[0]  # Split the line and get the first element
-            model_names.append(model_name)
+            if line.strip():
+                model_names.append(line.split()[0])  # Split the line and get the first element
         
         return model_names
 
-    def parse_last_pull_status(self, output):
-        """Parse the last line of docker pull output and extract details including byte size."""
-        import re
-        # Split the output into lines
-        lines = output.strip().split('\n')
-        
-        # Get the last non-empty line
-        last_line = lines[-1]
-        
-        # Regular expression to parse the line including byte size
-        pattern = r"(pulling\s+([0-9a-f]+))\.\.\.\s+(\d+)%.*?(\d+\s+[BKMG]B)"
-        match = re.search(pattern, last_line)
-        
-        if match:
-            # Extract relevant parts
-            message = match.group(1)  # 'pulling xxx'
-            percentage = int(match.group(3))  # Percentage as integer
-            byte_size = match.group(4)  # Byte size as string
-            return {
-                "message": message,
-                "percentage": percentage,
-                "byte_size": byte_size
-            }
-        else:
-            return None
-        
+    @traced("setup.setup_local_models")
     def setup_local_models(self):
-        """Set up local models using Docker and Ollama."""
+        """Set up local models using Docker and Ollama, downloading the missing ones in parallel."""
         specs = self.system.get_basic_info()
         click.debug_("System specs: RAM: {total} GB, Free Disk Space: {free} GB",total=specs['memory']['total'],free=specs['disk']['free'])
 
@@ -155,20 +188,15 @@ class Setup:
         self.check_docker_requirements()
 
         # Start Ollama server if not already running
-        if not self.docker_helper.container_exists(self.local_container_name):
-            click.echoDim("Starting Ollama Docker instance...")
-            self.docker_helper.create_instance(image=self.docker_image_ollama, command="", name=self.local_container_name, network="bridge")
-        else:
-            click.debug_("Searching Ollama Docker instance...")
-            state = self.docker_helper.search_and_start_container(self.local_container_name)
-            if not state:
-                click.warn_("Error: Could not find the existing Ollama Docker instance.")
-                exit(1)
-            if state == "started":
-                click.echoDim("Starting Ollama server. Waiting 20 seconds for it to be ready...")
-                time.sleep(20)
+        self.start_local_server()
 
-        # Configure and download local models
+        self.settings["LLM"] = self.settings.get("LLM", {})
+        self.settings["LLM"]["local"] = self.settings["LLM"].get("local", {})
+        installed = self.local_llm_models_installed()
+        helper = OllamaHelper(base_url=f"http://localhost:{self.ollama_port}")
+
+        # Configure local models, collecting the ones to download
+        missing = {}
         for name, config in self.llm_configs.items():
             if config["local"]:
                 meets_memory = specs["memory"]["total"] >= (config["minimum_ram_required"] or 0)
@@ -177,33 +205,121 @@ class Setup:
 
                 if meets_memory and meets_disk_space and meets_gpu:
                     just_model = name.replace("ollama/","")
-                    installed = self.local_llm_models_installed()
-                    self.settings["LLM"] = self.settings.get("LLM", {})
-                    self.settings["LLM"]["local"] = self.settings["LLM"].get("local", {})
-                    if just_model not in installed:
-                        click.echo("Downloading and configuring local model '{name}'...",name=just_model)
-                        try:
-                            from rich.progress import track
-                            for output in track(self.docker_helper.execute_command_stream(f"ollama pull {just_model}"), description=f"Downloading {just_model}..."):
-                                #print(output, end="")
-                                # show custom progress bar updates
-                                try:
-                                    data = self.parse_last_pull_status(output)
-                                    if data:
-                                        print(data)
-                                except Exception as e:
-                                    print(e)
-                                    
-                            self.settings["LLM"]["local"][name] = {"model": just_model}                            
-                        except Exception as e:
-                            click.warn_("An error ocurred downloading model: {model}",model=just_model)
-                            # remove the model from the settings if failed downloading and exists on settings
-                            if name in self.settings["LLM"]["local"]:
-                                self.settings["LLM"]["local"].pop(name)
-
+                    if helper.is_installed(just_model, installed):
+                        self.settings["LLM"]["local"][name] = {"model": just_model}
+                    else:
+                        missing[name] = just_model
                 else:
                     click.echo("Insufficient system resources for local model '{name}'.",name=name)
 
+        if missing:
+            for name, ok in self.pull_local_models(helper, missing).items():
+                if ok:
+                    self.settings["LLM"]["local"][name] = {"model": missing[name]}
+                else:
+                    click.warn_("An error ocurred downloading model: {model}",model=missing[name])
+                    # remove the model from the settings if failed downloading and exists on settings
+                    self.settings["LLM"]["local"].pop(name, None)
+
+    def pull_local_models(self, helper: OllamaHelper, models: Dict[str, str]) -> Dict[str, bool]:
+        """Download models concurrently ('pull_parallelism' of the Ollama settings at a time),
+        showing a bar per model and an aggregate bar, all in bytes (or, in JSON lines mode, emitting
+        'task', 'progress' and 'done' events per model).
+
+        Args:
+            helper (OllamaHelper): Helper of the Ollama server.
+            models (Dict[str, str]): Model name (as in llm_configs) -> Ollama model to pull.
+
+        Returns:
+            Dict[str, bool]: Model name -> whether it was downloaded.
+        """
+        from rich.progress import Progress, TextColumn, BarColumn, DownloadColumn, TransferSpeedColumn, TimeRemainingColumn
+        ollama = self.ollama_settings()
+        for model in models.values():
+            click.echo("Downloading and configuring local model '{name}'...",name=model)
+
+        # even disabled, a rich Progress writes to stdout, which only carries events in JSON lines mode
+        progress = None if click.json_lines else Progress(
+            TextColumn("{task.description}"), BarColumn(), DownloadColumn(), TransferSpeedColumn(), TimeRemainingColumn(),
+            console=click.console,
+        )
+        sizes = {name: [0, 0] for name in models}  # name -> [completed, total] bytes
+        # name -> (percent, status) of the last progress event, so events are emitted per percent, not per chunk
+        emitted = {}
+        with progress or contextlib.nullcontext():
+            if progress is None:
+                tasks = {name: index for index, name in enumerate(models)}
+                overall = None
+                for name, model in models.items():
+                    click.emit("task", task=tasks[name], message=f"Downloading {model}...", model=name)
+            else:
+                tasks = {name: progress.add_task(f"Downloading {model}...", total=None) for name, model in models.items()}
+                overall = progress.add_task("All models", total=None) if len(models) > 1 else None
+
+            def pull(name):
+                def on_progress(completed, total, status):
+                    sizes[name] = [completed, total]
+                    if progress is None:
+                        state = (completed * 100 // total if total else None, status)
+                        if emitted.get(name) != state:
+                            emitted[name] = state
+                            click.emit("progress", task=tasks[name], message=status, completed=completed, total=total or None)
+                        return
+                    progress.update(tasks[name], completed=completed, total=total or None)
+                    if overall is not None:
+                        progress.update(overall, completed=sum(size[0] for size in sizes.values()), total=sum(size[1] for size in sizes.values()) or None)
+                started = time.perf_counter()
+                try:
+                    ok = helper.pull(models[name], on_progress=on_progress, attempts=ollama["pull_attempts"])
+                except Exception as e:
+                    click.debug_("Error downloading {model}: {error}", model=models[name], error=str(e))
+                    ok = False
+                if progress is None:
+                    click.emit("done", task=tasks[name], ok=bool(ok), seconds=round(time.perf_counter() - started, 4))
+                return ok
+
+            with ThreadPoolExecutor(max_workers=max(1, ollama["pull_parallelism"])) as executor:
+                results = dict(zip(models, executor.map(pull, models)))
+        return results
+
+    def ollama_settings(self) -> Dict:
+        """Get the Ollama settings ('OLLAMA' key of the settings) with their defaults."""
+        return {"keep_alive": "30m", "ready_timeout": 120, "pull_parallelism": 2, "pull_attempts": 3, **self.settings.get("OLLAMA", {})}
+
+    @traced("setup.start_local_server")
+    def start_local_server(self) -> bool:
+        """Start (or create) the Ollama Docker instance and wait until its API answers.
+
+        Returns:
+            bool: True when the Ollama API is ready.
+        """
+        ollama = self.ollama_settings()
+        if not self.docker_helper.container_exists(self.local_container_name):
+            click.echoDim("Starting Ollama Docker instance...")
+            self.docker_helper.create_instance(
+                image=self.docker_image_ollama,
+                command="",
+                name=self.local_container_name,
+                network="bridge",
+                ports={f"{self.ollama_port}/tcp": self.ollama_port},
+                environment={"OLLAMA_KEEP_ALIVE": ollama["keep_alive"]},
+            )
+        else:
+            click.debug_("Searching Ollama Docker instance...")
+            state = self.docker_helper.search_and_start_container(self.local_container_name)
+            if not state:
+                click.warn_("Error: Could not find the existing Ollama Docker instance.")
+                exit(1)
+
+        helper = OllamaHelper(base_url=f"http://localhost:{self.ollama_port}", keep_alive=ollama["keep_alive"])
+        if helper.is_ready():
+            return True
+        click.echoDim("Waiting for the Ollama server to be ready...")
+        if not helper.wait_until_ready(timeout=ollama["ready_timeout"]):
+            click.warn_("The Ollama server didn't answer within {timeout} seconds.", timeout=ollama["ready_timeout"])
+            return False
+        return True
+
     def setup_remote_models(self):
         """Set up remote models with API keys."""
         click.echo("Please enter your *API keys* for *remote* LLMs:")
@@ -221,13 +337,84 @@ class Setup:
         if not self.settings["LLM"]["remote"]:
             self.settings["LLM"].pop("remote")
 
-    def run_initial_setup(self):
-        """Run the initial setup."""
+    def settings_hash(self) -> str:
+        """Hash the raw (still encrypted) home settings file and the local settings file, without decrypting them."""
+        digest = hashlib.sha256()
+        for path in (self.home_settings_path, self.local_settings_path):
+            digest.update(str(path).encode("utf-8"))
+            if path.exists():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def docker_socket_state(self) -> Optional[Dict]:
+        """Get the state of the Docker socket (None when missing); it changes when the daemon restarts.
+
+        The socket is the one the docker CLI would use (DOCKER_HOST or the active docker context);
+        a tcp host has no socket file, so only its url is compared.
+        """
+        host = DockerHelper.docker_host()
+        if not host.startswith("unix://"):
+            return {"host": host}
+        socket_path = host[len("unix://"):]
+        if not os.path.exists(socket_path):
+            return None
+        stat = os.stat(socket_path)
+        return {"inode": stat.st_ino, "changed": stat.st_ctime}
+
+    def fingerprint(self) -> Dict:
+        """Get the parts of the environment a validated setup depends on."""
+        return {"settings": self.settings_hash(), "docker": self.docker_socket_state()}
+
+    def load_fingerprint(self) -> Dict:
+        """Load the fingerprint saved by the last validated setup."""
+        try:
+            with open(self.fingerprint_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_fingerprint(self):
+        """Save the fingerprint of the environment after a validated setup, with the installed local models."""
+        fingerprint = self.fingerprint()
+        fingerprint["models"] = []
+        if self.settings.get("LLM", {}).get("local"):
+            fingerprint["models"] = sorted(OllamaHelper(base_url=f"http://localhost:{self.ollama_port}").installed_models() or [])
+        fingerprint["validated"] = time.time()
+        os.makedirs(self.fingerprint_path.parent, exist_ok=True)
+        tmp_path = self.fingerprint_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(fingerprint, file)
+        os.replace(tmp_path, self.fingerprint_path)
+
+    @traced("setup.is_warm")
+    def is_warm(self) -> bool:
+        """Check if the last validated setup still holds: same settings, same Docker daemon and same installed local models."""
+        saved = self.load_fingerprint()
+        current = self.fingerprint()
+        if not saved or saved.get("settings") != current["settings"] or saved.get("docker") != current["docker"]:
+            return False
+        if saved.get("models"):
+            # local models: their server must answer with the same models (a quick HTTP call, no docker exec)
+            installed = OllamaHelper(base_url=f"http://localhost:{self.ollama_port}").installed_models()
+            return installed is not None and sorted(installed) == saved["models"]
+        return True
+
+    @traced("setup.run_initial_setup")
+    def run_initial_setup(self, force: bool = False):
+        """Run the initial setup, unless the environment is unchanged since the last validated one.
+
+        Args:
+            force (bool, optional): Run every check even on a warm start. Defaults to False.
+        """
+        if not force and self.is_warm():
+            click.debug_("Setup unchanged since the last run, skipping checks.")
+            return
         # if self.settings has no keys, run initial setup
         if not self.settings:
             click.debug_("Running initial setup...")
         self.check_llm_settings()
         self.save_settings()
+        self.save_fingerprint()
 
     def re_run_setup(self, mode: str = "global"):
         """Rerun setup steps.
@@ -236,12 +423,14 @@ class Setup:
             mode (str, optional): Setup mode ('global' or 'local'). Defaults to 'global'.
         """
         click.echo(f"Re-running setup in {mode} mode...")
+        self.fingerprint_path.unlink(missing_ok=True)
         self.check_llm_settings()
         if mode == "local":
             with open(self.local_settings_path, 'w') as file:
                 json.dump(self.settings, file, indent=4)
         else:
             self.save_settings()
+        self.save_fingerprint()
 
     def handle_setup_command(self, command: str):
         """Handle setup commands ('setup' and 'setup local').
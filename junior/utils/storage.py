@@ -101,8 +101,11 @@ class EncryptedJSONStorage:
             data (Dict): The data to save.
         """
         encrypted_data = self.encrypt_value(data)
-        with open(self.filepath, 'w', encoding='utf-8') as file:
+        # Write to a temporary file first so a crash never leaves a truncated file behind
+        tmp_path = self.filepath + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
             json.dump(encrypted_data, file, indent=4)
+        os.replace(tmp_path, self.filepath)
 
     def load(self) -> Dict:
         """Loads and decrypts the data from a JSON file.
@@ -0,0 +1,253 @@
+import os, json, math, time, atexit, threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+class Histogram:
+    # relative width of each bucket; values are reported with ~2.5% error
+    base = 1.05
+
+    def __init__(self, data: Optional[Dict] = None):
+        """Initialize a compact HDR-style histogram with log-scaled buckets.
+
+        Args:
+            data (Dict, optional): Previously exported histogram to restore. Defaults to None.
+        """
+        data = data or {}
+        self.count = data.get("count", 0)
+        self.total = data.get("sum", 0.0)
+        self.min = data.get("min")
+        self.max = data.get("max")
+        self.zeros = data.get("zeros", 0)
+        self.buckets = {int(index): count for index, count in data.get("buckets", {}).items()}
+
+    def record(self, value: float):
+        """Record a single (non negative) value."""
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.floor(math.log(value, self.base))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Get the approximate value at the given percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # geometric middle of the bucket, clamped to the observed range
+                value = self.base ** (index + 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        """Get count, mean and the usual percentiles."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def export(self) -> Dict:
+        """Export the histogram into a JSON serializable dict."""
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "zeros": self.zeros,
+            "buckets": {str(index): count for index, count in sorted(self.buckets.items())},
+        }
+
+class Telemetry:
+    histograms = ["ttft_ms", "latency_ms", "tokens_in", "tokens_out", "tokens_per_second"]
+    counters = ["requests", "errors", "validation_failures", "retries", "hedges", "hedge_wins", "hedge_wasted_tokens", "cache_read_tokens", "cache_write_tokens", "cache_miss_tokens"]
+    # exponentially weighted moving averages, used for routing decisions
+    ewmas = ["latency_s", "tokens_per_second", "error_rate"]
+    ewma_alpha = 0.2
+
+    def __init__(self, storage_path: Path = Path.home() / ".junior" / "telemetry.json", flush_interval: float = 30):
+        """Initialize the per-model latency and throughput telemetry.
+
+        Recorded calls are kept in memory and written into the storage file 'flush_interval'
+        seconds after the first pending one, or at exit.
+
+        Args:
+            storage_path (Path, optional): JSON file to keep the telemetry in. Defaults to ~/.junior/telemetry.json.
+            flush_interval (float, optional): Seconds after which pending updates get flushed. Defaults to 30.
+        """
+        self.storage_path = Path(storage_path)
+        os.makedirs(self.storage_path.parent, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.models = self.load()
+        self.pending = 0
+        self.flush_timer = None
+        atexit.register(self.flush)
+
+    def load(self) -> Dict:
+        """Load the telemetry of every model from the storage file."""
+        if not self.storage_path.exists():
+            return {}
+        try:
+            with open(self.storage_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (json.JSONDecodeError, OSError):
+            return {}
+        return {model: self._restore(entry) for model, entry in data.get("models", {}).items()}
+
+    def _restore(self, entry: Dict = None) -> Dict:
+        entry = entry or {}
+        restored = {name: entry.get(name, 0) for name in self.counters}
+        for name in self.histograms:
+            restored[name] = Histogram(entry.get(name))
+        restored["ewma"] = {name: entry.get("ewma", {}).get(name) for name in self.ewmas}
+        return restored
+
+    def _update_ewma(self, entry: Dict, name: str, value: float):
+        previous = entry["ewma"][name]
+        entry["ewma"][name] = value if previous is None else (1 - self.ewma_alpha) * previous + self.ewma_alpha * value
+
+    def save(self):
+        """Save the telemetry to the storage file (through a temporary file, so a crash never leaves it half written)."""
+        with self.lock:
+            data = self.export()
+        tmp_path = self.storage_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(tmp_path, self.storage_path)
+
+    def flush(self):
+        """Write pending updates into the storage file."""
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            if not self.pending:
+                return
+            self.save()
+            self.pending = 0
+
+    def _mark_pending(self):
+        """Count an update and schedule its flush."""
+        self.pending += 1
+        if self.flush_timer is None:
+            self.flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def model(self, model_name: str) -> Dict:
+        """Get (creating if needed) the telemetry entry of a model."""
+        if model_name not in self.models:
+            self.models[model_name] = self._restore()
+        return self.models[model_name]
+
+    def record(self, model_name: str, latency: float, ttft: Optional[float] = None, tokens_in: int = 0, tokens_out: int = 0, validation_failures: int = 0, retries: int = 0, error: bool = False, cache_read_tokens: int = 0, cache_write_tokens: int = 0):
+        """Record a finished call to a model.
+
+        Args:
+            model_name (str): Name of the model (as in llm_configs).
+            latency (float): Total latency of the call in seconds.
+            ttft (float, optional): Time to first token in seconds, when known (streaming). Defaults to None.
+            tokens_in (int, optional): Prompt tokens. Defaults to 0.
+            tokens_out (int, optional): Completion tokens. Defaults to 0.
+            validation_failures (int, optional): Responses that didn't match the output schema. Defaults to 0.
+            retries (int, optional): Extra attempts made for this call. Defaults to 0.
+            error (bool, optional): Whether the call failed at the end. Defaults to False.
+            cache_read_tokens (int, optional): Prompt tokens served from the provider prompt cache. Defaults to 0.
+            cache_write_tokens (int, optional): Prompt tokens written into the provider prompt cache. Defaults to 0.
+        """
+        with self.lock:
+            self._record(model_name, latency, ttft, tokens_in, tokens_out, validation_failures, retries, error, cache_read_tokens, cache_write_tokens)
+            self._mark_pending()
+
+    def _record(self, model_name, latency, ttft, tokens_in, tokens_out, validation_failures, retries, error, cache_read_tokens, cache_write_tokens):
+        entry = self.model(model_name)
+        entry["requests"] += 1
+        entry["errors"] += int(error)
+        entry["validation_failures"] += validation_failures
+        entry["retries"] += retries
+        entry["cache_read_tokens"] += cache_read_tokens
+        entry["cache_write_tokens"] += cache_write_tokens
+        if not error:
+            entry["cache_miss_tokens"] += max(0, tokens_in - cache_read_tokens)
+        entry["latency_ms"].record(latency * 1000)
+        self._update_ewma(entry, "error_rate", float(error))
+        if not error:
+            self._update_ewma(entry, "latency_s", latency)
+        if ttft is not None:
+            entry["ttft_ms"].record(ttft * 1000)
+        if not error:
+            entry["tokens_in"].record(tokens_in)
+            entry["tokens_out"].record(tokens_out)
+            if tokens_out and latency > 0:
+                entry["tokens_per_second"].record(tokens_out / latency)
+                self._update_ewma(entry, "tokens_per_second", tokens_out / latency)
+
+    def record_hedge(self, model_name: str, won: bool, wasted_tokens: int = 0):
+        """Record a hedge request sent to a model.
+
+        Args:
+            model_name (str): Name of the model the hedge was sent to.
+            won (bool): Whether the hedge answered before the primary request.
+            wasted_tokens (int, optional): Tokens sent to whichever request got cancelled. Defaults to 0.
+        """
+        with self.lock:
+            entry = self.model(model_name)
+            entry["hedges"] += 1
+            entry["hedge_wins"] += int(won)
+            entry["hedge_wasted_tokens"] += wasted_tokens
+            self._mark_pending()
+
+    def latency_percentile(self, model_name: str, percent: float, min_samples: int = 0) -> Optional[float]:
+        """Get the observed latency percentile of a model in seconds (None without enough samples)."""
+        histogram = self.model(model_name)["latency_ms"]
+        if histogram.count < max(1, min_samples):
+            return None
+        return histogram.percentile(percent) / 1000
+
+    def ewma(self, model_name: str) -> Dict:
+        """Get the moving averages (latency_s, tokens_per_second, error_rate) of a model; None when unknown."""
+        if model_name not in self.models:
+            return {name: None for name in self.ewmas}
+        return dict(self.models[model_name]["ewma"])
+
+    def report(self) -> Dict:
+        """Get the counters and percentile summaries of every model."""
+        report = {}
+        for model_name, entry in sorted(self.models.items()):
+            report[model_name] = {name: entry[name] for name in self.counters}
+            for name in self.histograms:
+                report[model_name][name] = entry[name].summary()
+            report[model_name]["ewma"] = dict(entry["ewma"])
+        return report
+
+    def export(self) -> Dict:
+        """Export the raw telemetry (including buckets) into a JSON serializable dict."""
+        models = {}
+        for model_name, entry in self.models.items():
+            models[model_name] = {name: entry[name] for name in self.counters}
+            for name in self.histograms:
+                models[model_name][name] = entry[name].export()
+            models[model_name]["ewma"] = dict(entry["ewma"])
+        return {"updated": time.time(), "models": models}
+
+# Example Usage
+if __name__ == "__main__":
+    telemetry = Telemetry(storage_path=Path("telemetry_example.json"))
+    for latency in [0.4, 0.5, 0.6, 2.5]:
+        telemetry.record("openai/gpt-4", latency=latency, tokens_in=120, tokens_out=80)
+    telemetry.flush()
+    print(json.dumps(telemetry.report(), indent=4))
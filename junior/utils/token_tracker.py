@@ -1,57 +1,265 @@
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
+from cryptography.fernet import InvalidToken
 from junior.utils.storage import EncryptedJSONStorage
-import json
+import os, json, time, atexit, threading
+
+class UsageWindow:
+    def __init__(self, span_seconds: int, bucket_seconds: int, packed: str = ""):
+        """Initialize a bucketed sliding window of requests and tokens.
+
+        Args:
+            span_seconds (int): Length of the window in seconds (e.g. 60 for per-minute limits).
+            bucket_seconds (int): Granularity of each bucket in seconds.
+            packed (str, optional): Previously packed buckets to restore. Defaults to "".
+        """
+        self.span_seconds = span_seconds
+        self.bucket_seconds = bucket_seconds
+        self.size = max(1, span_seconds // bucket_seconds)
+        self.buckets = {}  # bucket index -> [requests, tokens]
+        if packed:
+            for item in packed.split(","):
+                index, requests, tokens = item.split(":")
+                self.buckets[int(index)] = [int(requests), int(tokens)]
+
+    def _index(self, now: Optional[float] = None) -> int:
+        return int((now if now is not None else time.time()) // self.bucket_seconds)
+
+    def _prune(self, current: int):
+        """Drop buckets that fell out of the window."""
+        oldest = current - self.size + 1
+        for index in [index for index in self.buckets if index < oldest]:
+            del self.buckets[index]
+
+    def add(self, requests: int = 1, tokens: int = 0, now: Optional[float] = None):
+        """Account requests and tokens into the current bucket."""
+        current = self._index(now)
+        self._prune(current)
+        bucket = self.buckets.setdefault(current, [0, 0])
+        bucket[0] += requests
+        bucket[1] += tokens
+
+    def totals(self, now: Optional[float] = None) -> Dict:
+        """Get the requests and tokens accounted within the window."""
+        self._prune(self._index(now))
+        return {
+            "requests": sum(bucket[0] for bucket in self.buckets.values()),
+            "tokens": sum(bucket[1] for bucket in self.buckets.values())
+        }
+
+    def pack(self) -> str:
+        """Pack the live buckets into a compact string (stored as a single encrypted value)."""
+        self._prune(self._index())
+        return ",".join(f"{index}:{requests}:{tokens}" for index, (requests, tokens) in sorted(self.buckets.items()))
 
 class TokenTracker:
-    def __init__(self, storage_path: Path = Path.home() / ".junior" / "tracking.json"):
-        """Initialize the TokenTracker."""
+    # window name -> (span seconds, bucket seconds)
+    windows_spec = {
+        "minute": (60, 5),
+        "day": (86400, 900),
+    }
+
+    def __init__(self, storage_path: Path = Path.home() / ".junior" / "tracking.json", flush_threshold: int = 50, flush_interval: float = 30):
+        """Initialize the TokenTracker.
+
+        Updates are appended to an encrypted journal and only written into the
+        tracking file every 'flush_threshold' updates, every 'flush_interval'
+        seconds or at exit. Journal entries left by a crashed run are replayed on load.
+
+        Args:
+            storage_path (Path, optional): Encrypted tracking file. Defaults to ~/.junior/tracking.json.
+            flush_threshold (int, optional): Pending updates that trigger a flush. Defaults to 50.
+            flush_interval (float, optional): Seconds after which pending updates get flushed. Defaults to 30.
+        """
         self.storage = EncryptedJSONStorage(str(storage_path))
+        self.journal_path = Path(self.storage.filepath).with_suffix(".journal")
+        self.flush_threshold = flush_threshold
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self.sequence = 0
         self.tracking_data = self.load_tracking_data()
+        self.windows = {}
+        # requests sent but not answered yet: model name -> [requests, estimated tokens]
+        self.in_flight = {}
+        self.pending = 0
+        self.last_flush = time.time()
+        # flushes pending updates 'flush_interval' seconds after the first one, even if no other update arrives
+        self.flush_timer = None
+        self.replay_journal()
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+        atexit.register(self.flush)
 
     def load_tracking_data(self) -> Dict:
-        """Load tracking data from the storage file."""
-        return self.storage.load() or {}
+        """Load the usage of every model from the storage file (and the last journal sequence into 'sequence').
+
+        The file holds {"models": {model name: usage}, "meta": {"sequence": int}}; files of
+        older versions only hold the models.
+        """
+        data = self.storage.load() or {}
+        if "models" not in data:
+            return data
+        self.sequence = data.get("meta", {}).get("sequence", 0)
+        return data["models"]
 
     def save_tracking_data(self):
         """Save tracking data to the storage file."""
-        self.storage.save(self.tracking_data)
+        for model_name, windows in self.windows.items():
+            if model_name not in self.tracking_data:
+                continue
+            for window_name, window in windows.items():
+                self.tracking_data[model_name][window_name] = window.pack()
+        self.storage.save({"models": self.tracking_data, "meta": {"sequence": self.sequence}})
+
+    def replay_journal(self):
+        """Apply the journal entries that didn't make it into the tracking file."""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    sequence, model_name, tokens, timestamp = json.loads(self.storage.cipher.decrypt(line.strip().encode()))
+                except (InvalidToken, ValueError):
+                    continue  # torn write of a crashed run
+                if sequence > self.sequence:
+                    self.sequence = sequence
+                    self._apply(model_name, tokens, timestamp)
+                    self.pending += 1
+        if self.pending:
+            self.save_tracking_data()
+        self.pending = 0
+        os.remove(self.journal_path)
+
+    def flush(self):
+        """Write pending updates into the tracking file and reset the journal."""
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            if not self.pending:
+                return
+            self.save_tracking_data()
+            self.journal.close()
+            self.journal = open(self.journal_path, "w", encoding="utf-8")
+            self.pending = 0
+            self.last_flush = time.time()
 
     def get_model_usage(self, model_name: str) -> Dict:
-        """Get the usage data for a specific model."""
+        """Get the lifetime usage data for a specific model."""
         return self.tracking_data.get(model_name, {"requests": 0, "tokens": 0})
 
-    def update_model_usage(self, model_name: str, tokens: int = 0):
-        """Update the usage data for a specific model."""
+    def get_model_windows(self, model_name: str) -> Dict[str, UsageWindow]:
+        """Get (restoring on first access) the sliding windows of a specific model."""
+        if model_name not in self.windows:
+            usage = self.get_model_usage(model_name)
+            self.windows[model_name] = {
+                name: UsageWindow(span, bucket, packed=usage.get(name, ""))
+                for name, (span, bucket) in self.windows_spec.items()
+            }
+        return self.windows[model_name]
+
+    def get_window_usage(self, model_name: str) -> Dict:
+        """Get the usage of a model within the current minute and day windows, counting its in-flight requests.
+
+        Returns:
+            Dict: Usage keyed like the 'limits' of llm_configs (e.g. 'tokens_per_minute').
+        """
+        usage = {}
+        with self.lock:
+            requests, tokens = self.in_flight.get(model_name, (0, 0))
+            for name, window in self.get_model_windows(model_name).items():
+                totals = window.totals()
+                usage[f"requests_per_{name}"] = totals["requests"] + requests
+                usage[f"tokens_per_{name}"] = totals["tokens"] + tokens
+        return usage
+
+    def reserve(self, model_name: str, tokens: int = 0):
+        """Count a request that was just dispatched against the limits of a model until it's released.
+
+        Usage is only recorded once a request finishes, so without reserving, every request
+        routed meanwhile would see the model's full headroom.
+
+        Args:
+            model_name (str): The name of the model.
+            tokens (int, optional): Estimated tokens of the request. Defaults to 0.
+        """
+        with self.lock:
+            reserved = self.in_flight.setdefault(model_name, [0, 0])
+            reserved[0] += 1
+            reserved[1] += tokens
+
+    def release(self, model_name: str, tokens: int = 0):
+        """Release a reservation made with reserve (once its actual usage was recorded, if any)."""
+        with self.lock:
+            reserved = self.in_flight.get(model_name)
+            if reserved is None:
+                return
+            reserved[0] -= 1
+            reserved[1] -= tokens
+            if reserved[0] <= 0:
+                del self.in_flight[model_name]
+
+    def _apply(self, model_name: str, tokens: int, timestamp: float):
+        """Account a request into the lifetime counters and windows of a model."""
         model_usage = self.get_model_usage(model_name)
         model_usage["requests"] += 1
         model_usage["tokens"] += tokens
-
         self.tracking_data[model_name] = model_usage
-        self.save_tracking_data()
 
-    def model_exceeds_limits(self, model_name: str, limits: Dict) -> bool:
-        """Check if a model exceeds its usage limits.
+        for window in self.get_model_windows(model_name).values():
+            window.add(requests=1, tokens=tokens, now=timestamp)
+
+    def update_model_usage(self, model_name: str, tokens: int = 0):
+        """Update the usage data for a specific model."""
+        with self.lock:
+            now = time.time()
+            self.sequence += 1
+            self._apply(model_name, tokens, now)
+            entry = json.dumps([self.sequence, model_name, tokens, now])
+            self.journal.write(self.storage.cipher.encrypt(entry.encode()).decode() + "\n")
+            self.journal.flush()
+            self.pending += 1
+            if self.pending >= self.flush_threshold or now - self.last_flush >= self.flush_interval:
+                self.flush()
+            elif self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    def remaining_headroom(self, model_name: str, limits: Dict) -> Dict:
+        """Get the remaining requests and tokens a model has within its limits.
 
         Args:
             model_name (str): The name of the model.
             limits (Dict): The usage limits for the model.
 
         Returns:
-            bool: True if any limit is exceeded, False otherwise.
+            Dict: Remaining amount per limit key, or None when the limit is not set.
         """
-        usage = self.get_model_usage(model_name)
+        usage = self.get_window_usage(model_name)
+        return {
+            key: (limit - usage.get(key, 0) if limit is not None else None)
+            for key, limit in limits.items()
+        }
 
-        if limits.get("requests_per_minute") is not None and usage["requests"] > limits["requests_per_minute"]:
-            return True
+    def model_exceeds_limits(self, model_name: str, limits: Dict, tokens: int = 0) -> bool:
+        """Check if a model exceeds its usage limits.
 
-        if limits.get("requests_per_day") is not None and usage["requests"] > limits["requests_per_day"]:
-            return True
+        Args:
+            model_name (str): The name of the model.
+            limits (Dict): The usage limits for the model.
+            tokens (int, optional): Tokens the next request is about to use. Defaults to 0.
+
+        Returns:
+            bool: True if any limit is exceeded, False otherwise.
+        """
+        headroom = self.remaining_headroom(model_name, limits)
 
-        if limits.get("tokens_per_minute") is not None and usage["tokens"] > limits["tokens_per_minute"]:
-            return True
+        for key in ("requests_per_minute", "requests_per_day"):
+            if headroom.get(key) is not None and headroom[key] < 1:
+                return True
 
-        if limits.get("tokens_per_day") is not None and usage["tokens"] > limits["tokens_per_day"]:
-            return True
+        for key in ("tokens_per_minute", "tokens_per_day"):
+            if headroom.get(key) is not None and headroom[key] < tokens:
+                return True
 
         return False
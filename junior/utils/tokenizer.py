@@ -0,0 +1,113 @@
+import hashlib, threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import tiktoken
+
+# Token counts of non OpenAI models are approximated with an OpenAI encoding scaled by
+# the average ratio between both tokenizers (measured on english prose and code).
+# family -> (tiktoken encoding, ratio); the first matching pattern of a model name wins.
+token_families = [
+    ("gpt-4", ("cl100k_base", 1.0)),
+    ("gpt3.5", ("cl100k_base", 1.0)),
+    ("gpt-3.5", ("cl100k_base", 1.0)),
+    ("claude", ("cl100k_base", 1.1)),
+    ("llama3", ("cl100k_base", 1.0)),
+    ("mistral", ("cl100k_base", 1.15)),
+    ("mixtral", ("cl100k_base", 1.15)),
+    ("phi3", ("cl100k_base", 1.15)),
+]
+
+class Tokenizer:
+    def __init__(self, cache_size: int = 1024, exact_margin: float = 0.15):
+        """Initialize the token counter shared by routing and tracking.
+
+        Args:
+            cache_size (int, optional): Amount of memoized segment counts. Defaults to 1024.
+            exact_margin (float, optional): Relative distance to a limit under which estimates
+                are replaced by exact counts. Defaults to 0.15.
+        """
+        self.encoders = {}
+        self.counts = OrderedDict()  # (content hash, encoding) -> tokens
+        self.cache_size = cache_size
+        self.exact_margin = exact_margin
+        # chars per token, calibrated with every exact count
+        self.chars_per_token = 4.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def family(model: str) -> tuple:
+        """Get the (encoding, ratio) used to count tokens of a model."""
+        model = (model or "").lower()
+        for pattern, family in token_families:
+            if pattern in model:
+                return family
+        return ("cl100k_base", 1.0)
+
+    def encoder(self, encoding: str):
+        """Get a cached tiktoken encoder."""
+        if encoding not in self.encoders:
+            self.encoders[encoding] = tiktoken.get_encoding(encoding)
+        return self.encoders[encoding]
+
+    def _exact(self, text: str, encoding: str) -> int:
+        """Exact tokens of a text for an encoding, memoized by content hash."""
+        key = (hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest(), encoding)
+        with self.lock:
+            if key in self.counts:
+                self.counts.move_to_end(key)
+                return self.counts[key]
+        tokens = len(self.encoder(encoding).encode(text, disallowed_special=()))
+        with self.lock:
+            self.counts[key] = tokens
+            if len(self.counts) > self.cache_size:
+                self.counts.popitem(last=False)
+            if tokens:
+                # exponential moving average keeps the estimator calibrated to our content
+                self.chars_per_token = 0.8 * self.chars_per_token + 0.2 * (len(text) / tokens)
+        return tokens
+
+    def count(self, text: str, model: str = "gpt-4") -> int:
+        """Count the tokens of a text for the given model.
+
+        Args:
+            text (str): The text to count.
+            model (str, optional): Model name (llm_configs name or model id). Defaults to "gpt-4".
+
+        Returns:
+            int: The count of tokens.
+        """
+        encoding, ratio = self.family(model)
+        return int(round(self._exact(text, encoding) * ratio))
+
+    def count_segments(self, segments: Iterable[str], model: str = "gpt-4") -> int:
+        """Count the tokens of several segments, reusing memoized counts of repeated ones (e.g. shared context)."""
+        return sum(self.count(segment, model) for segment in segments)
+
+    def estimate(self, text: str, model: str = "gpt-4") -> int:
+        """Cheaply estimate the tokens of a text from its length.
+
+        Non-ASCII text (CJK, emoji, accented words) takes far fewer characters per token, so it
+        is estimated from its UTF-8 bytes instead, at 3 bytes per token.
+        """
+        _, ratio = self.family(model)
+        if text.isascii():
+            return int(len(text) / self.chars_per_token * ratio)
+        return int(len(text.encode("utf-8")) / 3 * ratio)
+
+    def fits(self, text: str, model: str, budget: int, estimate: Optional[int] = None) -> Dict:
+        """Check if a text fits within a token budget, counting exactly only near the limit (or for non-ASCII text, which estimates can't be trusted for).
+
+        Args:
+            text (str): The text to check.
+            model (str): Model name.
+            budget (int): Maximum amount of tokens.
+            estimate (int, optional): Precomputed estimate for the model. Defaults to None.
+
+        Returns:
+            Dict: {"fits": bool, "tokens": int, "exact": bool}
+        """
+        tokens = self.estimate(text, model) if estimate is None else estimate
+        if abs(budget - tokens) > budget * self.exact_margin and text.isascii():
+            return {"fits": tokens <= budget, "tokens": tokens, "exact": False}
+        tokens = self.count(text, model)
+        return {"fits": tokens <= budget, "tokens": tokens, "exact": True}
@@ -0,0 +1,136 @@
+import os, json, time, functools, inspect, threading
+from typing import Callable, Dict, List, Optional
+
+# spans are only recorded once enable() is called (e.g. by the --profile flag), or from the start with JUNIOR_PROFILE=1
+_enabled = bool(os.environ.get("JUNIOR_PROFILE"))
+_events = []
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+class _NoopSpan:
+    """Shared do-nothing span returned while tracing is disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_noop = _NoopSpan()
+
+class Span:
+    def __init__(self, name: str, category: str, args: Dict):
+        """A timed section of the run, recorded as a Chrome trace 'complete' event when it ends."""
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "ts": round((self.start - _origin) * 1e6, 1),
+            "dur": round((end - self.start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args,
+        }
+        with _lock:
+            _events.append(event)
+        return False
+
+    def set(self, **args):
+        """Attach extra arguments (e.g. the chosen model) to the span."""
+        self.args.update(args)
+
+def enable():
+    """Start recording spans."""
+    global _enabled
+    _enabled = True
+
+def is_enabled() -> bool:
+    """Check if spans are being recorded."""
+    return _enabled
+
+def span(name: str, category: str = "junior", **args):
+    """Time a block of code: 'with span("brain.call", model=name):'. Costs a single check while disabled."""
+    if not _enabled:
+        return _noop
+    return Span(name, category, args)
+
+def traced(name: Optional[str] = None, category: str = "junior") -> Callable:
+    """Decorator timing every call of a function (sync or async) as a span named after it."""
+    def decorator(function):
+        span_name = name or function.__qualname__
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await function(*args, **kwargs)
+                with Span(span_name, category, {}):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Span(span_name, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def events() -> List[Dict]:
+    """Get a copy of the recorded events."""
+    with _lock:
+        return list(_events)
+
+def export_chrome_trace(path: str) -> str:
+    """Write the recorded spans as a Chrome trace-event JSON file (opens in chrome://tracing or Perfetto)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events(), "displayTimeUnit": "ms"}, file)
+    return path
+
+def summary(top: int = 15) -> List[Dict]:
+    """Aggregate the spans by name, slowest total time first.
+
+    Returns:
+        List[Dict]: {name, count, total_ms, mean_ms, max_ms} of the 'top' span names.
+    """
+    totals = {}
+    for event in events():
+        entry = totals.setdefault(event["name"], {"name": event["name"], "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        duration = event["dur"] / 1000
+        entry["count"] += 1
+        entry["total_ms"] += duration
+        entry["max_ms"] = max(entry["max_ms"], duration)
+    ranked = sorted(totals.values(), key=lambda entry: -entry["total_ms"])[:top]
+    for entry in ranked:
+        entry["mean_ms"] = entry["total_ms"] / entry["count"]
+    return ranked
+
+# Example Usage
+if __name__ == "__main__":
+    enable()
+
+    @traced()
+    def work():
+        time.sleep(0.01)
+
+    with span("example", items=3):
+        for _ in range(3):
+            work()
+    print(json.dumps(summary(), indent=4))
@@ -1,64 +1,222 @@
 # translator.py
 from deep_translator import GoogleTranslator as DeepGoogleTranslator
-from lingua import Language, LanguageDetectorBuilder
+from lingua import IsoCode639_1, Language, LanguageDetectorBuilder
 from junior.utils.cache import Cache
-import warnings
+from junior.utils.offline_translator import OfflineTranslator
+from junior.utils.tracing import traced
+import hashlib, re, threading, warnings
 
 # Ignore all warnings from the huggingface_hub.file_download module
 warnings.filterwarnings("ignore", module="huggingface_hub.file_download")
 
+# languages the detector can choose from (ISO 639-1 codes)
+default_languages = ('en', 'es', 'fr', 'de')
+
+# frequent short words, used to recognize obvious english text without running the detector
+stopwords = {
+    'en': {'the', 'and', 'is', 'are', 'to', 'of', 'you', 'your', 'with', 'for', 'this', 'that', 'in', 'on', 'not', 'be', 'it', 'an', 'please', 'select', 'enter', 'using', 'found', 'no'},
+    'es': {'el', 'la', 'los', 'las', 'de', 'que', 'y', 'en', 'un', 'una', 'es', 'por', 'con', 'para', 'tu', 'su', 'del', 'al'},
+    'fr': {'le', 'la', 'les', 'de', 'et', 'est', 'un', 'une', 'des', 'pour', 'vous', 'avec', 'que', 'du', 'au', 'pas'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'ein', 'eine', 'mit', 'sie', 'zu', 'den', 'dem', 'ich', 'auf'},
+}
+
+# longest text sent in one online request (Google Translate accepts up to 5000 characters)
+batch_max_chars = 4500
+
 class TranslationService:
-    def __init__(self, cache_dir=None, offline_model='opus-mt', cache_ttl=3600):
+    # one detector per (languages, accuracy mode) for the whole process; building one loads its language models
+    _detectors = {}
+    _detectors_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, offline_model='opus-mt', cache_ttl=30 * 24 * 3600, languages=default_languages, low_accuracy=True, cache_size=5000):
+        """Initialize the translation service.
+
+        Args:
+            cache_dir (str, optional): Directory of the translations cache. Defaults to ~/.junior.
+            offline_model (str, optional): Offline translation model. Defaults to 'opus-mt'.
+            cache_ttl (int, optional): Seconds translations stay cached. Defaults to 30 days.
+            languages (tuple, optional): ISO 639-1 codes of the languages to detect (english is always included). Defaults to default_languages.
+            low_accuracy (bool, optional): Faster detection, accurate enough for UI strings; use False for user input. Defaults to True.
+            cache_size (int, optional): Maximum translations kept in the cache. Defaults to 5000.
+        """
         self.translator_offline_model_name = offline_model
         self.translator_offline = None
-        self.translator_online = DeepGoogleTranslator()
-        self.cache = Cache(directory=cache_dir)
+        self.translators_online = {}
+        # every TranslationService of the process (one per Localizer and CLIManager) shares the cache of the file
+        self.cache = Cache.shared(directory=cache_dir, namespace="translations", max_entries=cache_size)
         self.cache_ttl = cache_ttl
+        self.low_accuracy = low_accuracy
+        self.set_languages(languages)
+
+    def set_languages(self, languages):
+        """Set the languages to detect (ISO 639-1 codes); english is always included, as it's the source language of the messages.
+
+        Raises:
+            ValueError: A code isn't a language the detector knows.
+        """
+        codes = {code.strip().lower() for code in languages if code.strip()} | {'en'}
+        unknown = sorted(code for code in codes if not hasattr(IsoCode639_1, code.upper()))
+        if unknown:
+            raise ValueError(f"Unknown language codes: {', '.join(unknown)} (expected ISO 639-1 codes, e.g. 'es')")
+        self.languages = tuple(sorted(codes))
+        # stopwords of the other languages that can't be english words too
+        self.foreign_stopwords = set().union(*(stopwords.get(code, set()) for code in self.languages if code != 'en')) - stopwords['en']
 
-    #def _load_translator_offline(self):
-    #    """Load the offline translator model only when needed."""
-    #    if self.translator_offline is None:
-    #        from easynmt import EasyNMT
-    #        self.translator_offline = EasyNMT(self.translator_offline_model_name, device='cpu')
+    @property
+    def detector(self):
+        """Get the shared language detector, building it (with preloaded models) on first use."""
+        key = (self.languages, self.low_accuracy)
+        detector = TranslationService._detectors.get(key)
+        if detector is None:
+            with TranslationService._detectors_lock:
+                detector = TranslationService._detectors.get(key)
+                if detector is None:
+                    languages = [Language.from_iso_code_639_1(getattr(IsoCode639_1, code.upper())) for code in self.languages]
+                    builder = LanguageDetectorBuilder.from_languages(*languages).with_preloaded_language_models()
+                    if self.low_accuracy:
+                        builder = builder.with_low_accuracy_mode()
+                    detector = builder.build()
+                    TranslationService._detectors[key] = detector
+        return detector
 
+    def is_obviously_english(self, text):
+        """Fast check for plain ASCII text with english stopwords and none of the other languages."""
+        if 'en' not in self.languages or not text.isascii():
+            return False
+        words = set(re.findall(r"[a-z']+", text.lower()))
+        if not words & stopwords['en']:
+            return False
+        return not words & self.foreign_stopwords
+
+    def _load_translator_offline(self):
+        """Create the offline translator only when needed (its models load lazily in worker processes)."""
+        if self.translator_offline is None:
+            self.translator_offline = OfflineTranslator(self.translator_offline_model_name)
+        return self.translator_offline
+
+    @traced("translator.detect_language")
     def detect_language(self, text):
-        languages = [Language.ENGLISH, Language.FRENCH, Language.GERMAN, Language.SPANISH]
-        detector = LanguageDetectorBuilder.from_languages(*languages).build()
-        detected = detector.detect_language_of(text)
+        """Detect the ISO 639-1 code of the language of a text (english when unsure)."""
+        if self.is_obviously_english(text):
+            return 'en'
+        detected = self.detector.detect_language_of(text)
+        if detected is None:
+            return 'en'
         return detected.iso_code_639_1.name.lower()
 
-    #def translate_offline(self, text, target_lang='en'):
-    #    self._load_translator_offline()
-    #    source_lang = self.detect_language(text)
-    #    if source_lang == target_lang:
-    #        return text
-        
-    #    cache_key = f"{source_lang}:{target_lang}:{text}"
-    #    cached_translation = self.cache.get(cache_key)
-
-        #if cached_translation:
-        #    return cached_translation
-
-    #    translation = self.translator_offline.translate(text, source_lang=source_lang, target_lang=target_lang)
-    #    self.cache.set(cache_key, translation, ttl=self.cache_ttl)
-    #    #print(f"!source language: {source_lang}, target language: {target_lang}")
-    #    #print(f"!source text: {text}")
-    #    #print(f"!offline translated text: {translation}")
-    #    return translation
+    @traced("translator.translate_offline")
+    def translate_offline(self, text, target_lang='en'):
+        """Translate a text with the offline model (returned as is when no model is available)."""
+        source_lang = self.detect_language(text)
+        if source_lang == target_lang:
+            return text
+
+        cached_translation = self.cached_translation(text, source_lang, target_lang)
+        if cached_translation is not None:
+            return cached_translation
+
+        translations = self._load_translator_offline().translate([text], source_lang, target_lang)
+        if translations is None:
+            return text
+        translation = translations[0]
+        self.cache.set(self.cache_key(text, source_lang, target_lang), '' if translation == text else translation, ttl=self.cache_ttl)
+        return translation
+
+    @staticmethod
+    def cache_key(text, source_lang, target_lang):
+        """Get the cache key of a translation (hashed, so long texts don't bloat the cache file)."""
+        return f"{source_lang}:{target_lang}:" + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def cached_translation(self, text, source_lang, target_lang):
+        """Get a cached translation; '' is cached for texts the translator returned unchanged."""
+        cached = self.cache.get(self.cache_key(text, source_lang, target_lang))
+        if cached is None:
+            return None
+        return cached or text
+
+    def online_translator(self, source_lang, target_lang):
+        """Get the online translator of a language pair (deep_translator binds the languages at creation)."""
+        key = (source_lang, target_lang)
+        if key not in self.translators_online:
+            self.translators_online[key] = DeepGoogleTranslator(source=source_lang, target=target_lang)
+        return self.translators_online[key]
+
+    @traced("translator.translate_batch")
+    def translate_batch(self, texts, target_lang='en', source_lang='en', online=True):
+        """Translate many texts with as few requests as possible.
+
+        Texts are joined one per line into requests of up to batch_max_chars characters; when a
+        response doesn't split back into the same number of lines, that group is translated one by one.
 
+        Args:
+            texts (list): Texts to translate (without line breaks, e.g. UI messages).
+            target_lang (str, optional): Language to translate to. Defaults to 'en'.
+            source_lang (str, optional): Language of the texts. Defaults to 'en'.
+            online (bool, optional): Use the online translator, else the offline model. Defaults to True.
+
+        Returns:
+            list: The translations, in the order of the texts (a text is returned as is when its translation failed).
+        """
+        if source_lang == target_lang:
+            return list(texts)
+        cached = {text: self.cached_translation(text, source_lang, target_lang) for text in texts}
+        missing = list(dict.fromkeys(text for text, translation in cached.items() if translation is None))
+        if not online:
+            translations = self._load_translator_offline().translate(missing, source_lang, target_lang) if missing else []
+            if translations is None:
+                return [cached[text] or text for text in texts]
+            fetched = dict(zip(missing, translations))
+            self.cache.set_many({self.cache_key(text, source_lang, target_lang): '' if translation == text else translation for text, translation in fetched.items()}, ttl=self.cache_ttl)
+            return [cached[text] if cached[text] is not None else fetched[text] for text in texts]
+
+        translator = self.online_translator(source_lang, target_lang)
+        groups, group, size = [], [], 0
+        for text in missing:
+            if group and size + len(text) + 1 > batch_max_chars:
+                groups.append(group)
+                group, size = [], 0
+            group.append(text)
+            size += len(text) + 1
+        if group:
+            groups.append(group)
+
+        translations = []
+        failed = set()
+        for group in groups:
+            lines = None
+            if all('\n' not in text for text in group):
+                try:
+                    lines = (translator.translate('\n'.join(group)) or '').split('\n')
+                except Exception:
+                    lines = None
+            if lines is None or len(lines) != len(group):
+                lines = []
+                for text in group:
+                    try:
+                        lines.append(translator.translate(text) or text)
+                    except Exception:
+                        lines.append(text)
+                        failed.add(text)
+            translations.extend(line.strip() or text for line, text in zip(lines, group))
+
+        fetched = dict(zip(missing, translations))
+        # texts returned unchanged are cached too (as ''), so they aren't requested again; failures aren't cached
+        self.cache.set_many({self.cache_key(text, source_lang, target_lang): '' if translation == text else translation for text, translation in fetched.items() if text not in failed}, ttl=self.cache_ttl)
+        return [cached[text] if cached[text] is not None else fetched[text] for text in texts]
+
+    @traced("translator.translate_online")
     def translate_online(self, text, target_lang='en'):
         source_lang = self.detect_language(text)
         if source_lang == target_lang:
             return text
     
-        cache_key = f"{source_lang}:{target_lang}:{text}"
-        cached_translation = self.cache.get(cache_key)
-
-        #if cached_translation:
-        #    return cached_translation
+        cached_translation = self.cached_translation(text, source_lang, target_lang)
+        if cached_translation is not None:
+            return cached_translation
 
-        translation = self.translator_online.translate(text, source=source_lang, target=target_lang)
-        self.cache.set(cache_key, translation, ttl=self.cache_ttl)
+        translation = self.online_translator(source_lang, target_lang).translate(text)
+        # texts returned unchanged are cached as '' (negative caching), so they aren't requested again
+        self.cache.set(self.cache_key(text, source_lang, target_lang), '' if translation == text else translation, ttl=self.cache_ttl)
         #print(f"source language: {source_lang}, target language: {target_lang}")
         #print(f"source text: {text}")
         #print(f"online translated text: {translation}")
@@ -75,10 +233,7 @@ class TranslationService:
                 #print("Translating online")
                 return tmp
             except Exception:
-                #print("Translating offline", Exception)
-                #return self.translate_offline(text, target_lang)
-                return text # return as is
+                # network failure: use the local model instead
+                return self.translate_offline(text, target_lang)
         else:
-            #print("Translating offline OK")
-            #return self.translate_offline(text, target_lang)
-            return text # return as is
\ No newline at end of file
+            return self.translate_offline(text, target_lang)
\ No newline at end of file
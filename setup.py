@@ -20,5 +20,5 @@ setup(
         'restrictedpython',
         'babel',
     ],
-    python_requires='>=3.7, <4',
+    python_requires='>=3.9, <4',
 )
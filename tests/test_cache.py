@@ -0,0 +1,74 @@
+import json, threading
+from junior.utils.cache import Cache
+
+def test_set_many_saves_once_and_reloads(tmp_path):
+    cache = Cache(directory=tmp_path, namespace="test")
+    cache.set_many({"a": 1, "b": [2, 3]})
+    assert cache.get("a") == 1
+    with open(cache.cache_file, encoding="utf-8") as file:
+        assert set(json.load(file)) == {"a", "b"}
+    assert Cache(directory=tmp_path, namespace="test").get("b") == [2, 3]
+
+def test_set_many_ignores_empty_items(tmp_path):
+    cache = Cache(directory=tmp_path, namespace="test")
+    cache.set_many({})
+    assert not (tmp_path / "test.json").exists()
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = Cache(directory=tmp_path, namespace="test")
+    cache.set("old", "value", ttl=-1)
+    assert cache.get("old") is None
+    assert "old" not in cache.cache
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = Cache(directory=tmp_path, namespace="test", max_entries=3)
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+    # reading 'a' makes 'b' the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("d", 4)
+    assert list(cache.cache) == ["c", "a", "d"]
+    assert cache.get("b") is None
+
+def test_evicted_order_survives_a_reload(tmp_path):
+    cache = Cache(directory=tmp_path, namespace="test", max_entries=2)
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+    assert list(Cache(directory=tmp_path, namespace="test", max_entries=2).cache) == ["b", "c"]
+
+def test_shared_returns_one_cache_per_file(tmp_path):
+    first = Cache.shared(directory=tmp_path, namespace="shared")
+    second = Cache.shared(directory=tmp_path, namespace="shared")
+    other = Cache.shared(directory=tmp_path, namespace="other")
+    assert first is second
+    assert first is not other
+    first.set("from-first", 1)
+    second.set("from-second", 2)
+    on_disk = Cache(directory=tmp_path, namespace="shared")
+    assert on_disk.get("from-first") == 1 and on_disk.get("from-second") == 2
+
+def test_concurrent_readers_and_writers(tmp_path):
+    cache = Cache(directory=tmp_path, namespace="test", max_entries=50)
+    errors = []
+
+    def write(offset):
+        try:
+            for start in range(0, 200, 20):
+                cache.set_many({f"{offset}-{index}": index for index in range(start, start + 20)})
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            for index in range(2000):
+                cache.get(f"0-{index % 200}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(offset,)) for offset in range(3)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(cache.cache) == 50
+    with open(cache.cache_file, encoding="utf-8") as file:
+        assert len(json.load(file)) == 50
@@ -0,0 +1,75 @@
+import io, json
+import pytest
+
+cli_manager = pytest.importorskip("junior.cli_manager")
+CLIManager = cli_manager.CLIManager
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setattr(CLIManager, "output_format", "jsonl")
+    return CLIManager(domain="test")
+
+def events(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+def test_emit_writes_one_json_object_per_line(cli, capsys):
+    cli.emit("message", text="héllo", count=2)
+    cli.emit("done", ok=True)
+    first, second = events(capsys)
+    assert first["event"] == "message" and first["domain"] == "test"
+    assert first["text"] == "héllo" and first["count"] == 2
+    assert isinstance(first["t"], float) and second["t"] >= first["t"]
+    assert second == {"event": "done", "domain": "test", "t": second["t"], "ok": True}
+
+def test_echo_emits_plain_untranslated_text(cli, capsys):
+    cli.echo("*Processing input:* {input}", input="a_b")
+    cli.warn_("Error calling {model}", model="openai/gpt-4")
+    message, warning = events(capsys)
+    assert message["event"] == "message" and message["text"] == "Processing input: a_b"
+    assert warning["event"] == "warning" and warning["text"] == "Error calling openai/gpt-4"
+
+def test_process_emits_task_progress_and_done(cli, capsys):
+    def task():
+        yield ("Step {step}", {"step": 1}, (1, 2))
+        yield ("Step {step}", {"step": 2}, (2, 2))
+    assert cli.process(task, "Working") is None
+    kinds = [(event["event"], event.get("message")) for event in events(capsys)]
+    assert kinds == [("task", "Working"), ("progress", "Step 1"), ("progress", "Step 2"), ("done", None)]
+
+def test_process_returns_none_when_the_task_fails(cli, capsys):
+    fields = []
+    def task():
+        yield {"summary": "partial", "points": None}
+        raise RuntimeError("Streaming from openai/gpt-4 failed: the output didn't validate")
+    assert cli.process(task, "Working", on_field=lambda key, value: fields.append((key, value))) is None
+    done = events(capsys)[-1]
+    assert done["event"] == "done" and done["ok"] is False and "didn't validate" in done["error"]
+    # 'summary' was the last field being generated, so it never completed
+    assert fields == []
+
+def test_debug_messages_are_json_events(cli, capsys):
+    cli.debug_("Output language set to: {lang}", lang="es")
+    (debug,) = events(capsys)
+    assert debug["event"] == "debug" and debug["text"] == "Output language set to: es"
+
+def test_prompt_reads_the_answer_from_piped_stdin(cli, capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("sk-test\n"))
+    assert cli.prompt(("Enter *{name}* API Key", {"name": "OpenAI"}), default="") == "sk-test"
+    assert events(capsys)[0]["event"] == "prompt"
+
+def test_select_falls_back_to_the_default_when_stdin_is_closed(cli, capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+    assert cli.select("Local or remote?", choices=["local", "remote"], default="remote") == "remote"
+
+def test_required_input_fails_fast_when_stdin_is_closed(cli, capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+    with pytest.raises(SystemExit):
+        cli.prompt("Enter a name")
+    error = events(capsys)[-1]
+    assert error["event"] == "error" and error["reason"] == "input_required"
+
+def test_user_input_gets_the_accurate_detector(cli):
+    assert cli.translator.low_accuracy is False
+    assert cli.localizer.translator.low_accuracy is True
+    assert cli.translator.detect_language("ok gracias") == "es"
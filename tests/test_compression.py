@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from junior.utils.compression import split_instruction, split_text
+
+def test_split_text_keeps_small_texts_whole():
+    assert split_text("short text", 100) == ["short text"]
+
+def test_split_text_chunks_respect_the_limit():
+    text = "\n\n".join(f"paragraph {index} " + "x" * 50 for index in range(40))
+    chunks = split_text(text, 300)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+def test_split_text_cuts_long_lines():
+    chunks = split_text("y" * 1000, 300)
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+
+def test_split_text_starts_chunks_at_file_sections():
+    text = "## a.py\n" + "a" * 200 + "\n\n## b.py\n" + "b" * 50
+    chunks = split_text(text, 350)
+    assert len(chunks) == 2
+    assert chunks[1].startswith("## b.py")
+
+def test_split_instruction_repeats_leading_and_trailing_paragraphs():
+    instruction, content = split_instruction("Summarize this log.\n\nline 1\n\nline 2\n\nList the errors.")
+    assert instruction == "Summarize this log.\n\nList the errors."
+    assert content == "line 1\n\nline 2"
+
+def test_split_instruction_without_a_short_paragraph():
+    prompt = "z" * 5000
+    assert split_instruction(prompt) == ("Process the following input.", prompt)
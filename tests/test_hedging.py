@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+brain_module = pytest.importorskip("junior.utils.brain")
+
+from pydantic import BaseModel
+from junior.utils.telemetry import Telemetry
+from junior.utils.token_tracker import TokenTracker
+from junior.utils.tokenizer import Tokenizer
+
+Brain = brain_module.Brain
+
+class Answer(BaseModel):
+    text: str
+
+class FakeCompletions:
+    """Answers after 'delay' seconds."""
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    async def create_with_completion(self, **request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Answer(text="done"), SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+class FakePool:
+    def __init__(self, delays, busy=()):
+        self.completions = {name: FakeCompletions(delay) for name, delay in delays.items()}
+        self.busy = busy
+
+    def get_async(self, model_name):
+        completions = self.completions[model_name]
+        return type("Client", (), {"chat": type("Chat", (), {"completions": completions})})
+
+    def limit(self, model_name):
+        return BusySlot() if model_name in self.busy else asyncio.Semaphore(1)
+
+class BusySlot:
+    """A concurrency slot that never frees up: requests waiting on it are never sent."""
+    async def __aenter__(self):
+        await asyncio.sleep(3600)
+
+    async def __aexit__(self, *exc):
+        return False
+
+def make_brain(tmp_path, pool):
+    brain = Brain.__new__(Brain)
+    config = {"limits": {}, "max_output_tokens": 64, "fallback": None}
+    brain.llm_configs = {"openai/slow": dict(config), "groq/fast": dict(config)}
+    brain.instructors = pool
+    brain.tokenizer = Tokenizer()
+    brain.token_tracker = TokenTracker(storage_path=tmp_path / "tracking.json")
+    brain.telemetry = Telemetry(storage_path=tmp_path / "telemetry.json")
+    brain.hedging = {**Brain.hedging_defaults, "default_delay": 0.05}
+    brain.retry = dict(Brain.retry_defaults)
+    brain.validation_retries = 0
+    brain.breakers = {}
+    brain.choose_best_model = lambda prompt, category, exclude=None: "groq/fast"
+    return brain
+
+def tokens_used(brain, model_name):
+    return brain.token_tracker.get_window_usage(model_name).get("tokens_per_minute", 0)
+
+def test_a_sent_loser_counts_as_wasted(tmp_path):
+    brain = make_brain(tmp_path, FakePool({"openai/slow": 1, "groq/fast": 0.01}))
+    result = asyncio.run(brain.ahedged_call("openai/slow", "a prompt " * 40, Answer))
+    assert result.text == "done"
+    wasted = brain.telemetry.model("groq/fast")["hedge_wasted_tokens"]
+    assert wasted == brain.tokenizer.estimate("a prompt " * 40, "openai/slow") > 0
+    assert tokens_used(brain, "openai/slow") == wasted
+    assert brain.token_tracker.in_flight.get("openai/slow", [0, 0]) == [0, 0]
+
+def test_an_unsent_loser_only_releases_its_reservation(tmp_path):
+    pool = FakePool({"openai/slow": 1, "groq/fast": 0.01}, busy=("openai/slow",))
+    brain = make_brain(tmp_path, pool)
+    result = asyncio.run(brain.ahedged_call("openai/slow", "a prompt " * 40, Answer))
+    assert result.text == "done"
+    assert pool.completions["openai/slow"].calls == 0
+    assert brain.telemetry.model("groq/fast")["hedge_wasted_tokens"] == 0
+    assert tokens_used(brain, "openai/slow") == 0
+    assert brain.token_tracker.in_flight.get("openai/slow", [0, 0]) == [0, 0]
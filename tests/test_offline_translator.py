@@ -0,0 +1,67 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from junior.utils.offline_translator import OfflineTranslator, split_sentences
+
+class FakeExecutor:
+    """Runs batches in process; 'outcomes' decides, call by call, whether to translate, break the pool or miss the model."""
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+
+    def submit(self, function, model_id, sentences, local_only):
+        future = Future()
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if outcome == "broken":
+            future.set_exception(BrokenProcessPool("worker died"))
+        elif outcome == "missing":
+            future.set_result(None)
+        else:
+            future.set_result([sentence.upper() for sentence in sentences])
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+@pytest.fixture
+def translator(monkeypatch):
+    monkeypatch.setattr(OfflineTranslator, "is_installed", staticmethod(lambda: True))
+    translator = OfflineTranslator(workers=1, batch_size=2)
+    translator.executors = []
+
+    def executor(outcomes):
+        def create():
+            if translator.pool is None:
+                translator.pool = FakeExecutor(outcomes)
+                translator.executors.append(translator.pool)
+            return translator.pool
+        monkeypatch.setattr(translator, "executor", create)
+    monkeypatch.setattr(translator, "close", lambda: setattr(translator, "pool", None))
+    translator.use = executor
+    return translator
+
+def test_split_sentences_keeps_the_layout():
+    text = "Hello world. How are you?\n\nFine!  Thanks"
+    pairs = split_sentences(text)
+    assert [sentence for sentence, _ in pairs] == ["Hello world.", "How are you?", "Fine!", "Thanks"]
+    assert "".join(sentence + separator for sentence, separator in pairs) == text
+
+def test_translates_each_distinct_sentence_once(translator):
+    translator.use([])
+    assert translator.translate(["One. Two.", "One."], "en", "es") == ["ONE. TWO.", "ONE."]
+
+def test_broken_pool_is_rebuilt(translator):
+    translator.use(["broken"])
+    assert translator.translate(["One. Two. Three."], "en", "es") == ["ONE. TWO. THREE."]
+    assert len(translator.executors) == 2
+    assert not translator.unavailable
+
+def test_pool_that_keeps_breaking_doesnt_disable_the_pair(translator):
+    translator.use(["broken", "broken", "broken", "broken"])
+    assert translator.translate(["One."], "en", "es") is None
+    assert not translator.unavailable
+
+def test_missing_model_disables_the_pair(translator):
+    translator.use(["missing"])
+    assert translator.translate(["One."], "en", "xx") is None
+    assert ("en", "xx") in translator.unavailable
+    assert translator.translate(["One."], "en", "xx") is None
@@ -0,0 +1,93 @@
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+import pytest
+
+pytest.importorskip("instructor")
+pytest.importorskip("anthropic")
+brain = pytest.importorskip("junior.utils.brain")
+
+from pydantic import BaseModel
+from junior.utils.llm_clients import ClientPool
+
+recorded_response = (Path(__file__).parent / "fixtures" / "anthropic_cached_message.json").read_bytes()
+
+class Summary(BaseModel):
+    summary: str
+    points: List[str]
+
+def anthropic_config(prompt_caching):
+    return {
+        "model": "claude-3-5-sonnet-20240620",
+        "context_window_tokens": 200000,
+        "max_output_tokens": 1024,
+        "expert_for": ["everything"],
+        "local": False,
+        "limits": {},
+        "prompt_caching": prompt_caching,
+        "fallback": None,
+    }
+
+@pytest.fixture
+def stub():
+    """Local stand-in for the Anthropic API: records every request and replays a recorded response."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            requests.append({"path": self.path, "headers": {name.lower(): value for name, value in self.headers.items()}, "body": json.loads(body)})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(recorded_response)))
+            self.end_headers()
+            self.wfile.write(recorded_response)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", requests
+    server.shutdown()
+
+def call(stub_url, prompt_caching):
+    configs = {"anthropic/claude-3": anthropic_config(prompt_caching)}
+    settings = {"LLM": {"remote": {"Anthropic": "test-key"}}, "HTTP": {"base_urls": {"anthropic": stub_url}}}
+    pool = ClientPool(settings, configs)
+    fake_brain = SimpleNamespace(llm_configs=configs)
+    messages = brain.Brain.build_messages(fake_brain, "anthropic/claude-3", "Summarize the project.", context="# README\n" + "lorem ipsum " * 500)
+    output, completion = pool["anthropic/claude-3"].chat.completions.create_with_completion(
+        model=configs["anthropic/claude-3"]["model"],
+        response_model=Summary,
+        max_tokens=1024,
+        max_retries=1,
+        **messages,
+    )
+    pool.close()
+    return output, completion
+
+def test_cacheable_models_send_cache_control_and_beta_header(stub):
+    stub_url, requests = stub
+    output, completion = call(stub_url, prompt_caching=True)
+
+    assert output.points == ["click", "rich"]
+    request = requests[0]
+    assert request["path"].endswith("/v1/messages")
+    assert request["headers"]["anthropic-beta"] == "prompt-caching-2024-07-31"
+    context_block, prompt_block = request["body"]["messages"][0]["content"]
+    assert context_block["cache_control"] == {"type": "ephemeral"}
+    assert context_block["text"].startswith("# README")
+    assert "cache_control" not in prompt_block
+    assert brain.Brain.cache_tokens(completion) == (2048, 0)
+    assert brain.Brain.usage_tokens(completion) == (14 + 2048, 21)
+
+def test_other_models_send_no_cache_control(stub):
+    stub_url, requests = stub
+    call(stub_url, prompt_caching=False)
+
+    request = requests[0]
+    assert "anthropic-beta" not in request["headers"]
+    assert all("cache_control" not in block for block in request["body"]["messages"][0]["content"])
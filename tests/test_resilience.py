@@ -0,0 +1,77 @@
+import time
+from types import SimpleNamespace
+import pytest
+from junior.utils.resilience import CircuitBreaker, backoff_delay, is_provider_failure, is_transient, retry_after
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+class APIConnectionError(Exception):
+    pass
+
+def test_transient_errors():
+    assert is_transient(StatusError(429))
+    assert is_transient(StatusError(503))
+    assert is_transient(APIConnectionError())
+    assert not is_transient(StatusError(400))
+    assert not is_transient(ValueError())
+
+def test_provider_failures_include_auth_errors():
+    assert is_provider_failure(StatusError(401))
+    assert is_provider_failure(StatusError(500))
+    assert not is_provider_failure(StatusError(422))
+
+def test_retry_after_headers():
+    assert retry_after(StatusError(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(StatusError(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(StatusError(429, {"retry-after": "soon"})) is None
+    assert retry_after(StatusError(429)) is None
+
+def test_backoff_is_jittered_and_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base_delay=0.5, max_delay=4)
+        assert 0 <= delay <= min(4, 0.5 * 2 ** attempt)
+
+def test_backoff_honors_retry_after_beyond_max_delay():
+    assert backoff_delay(0, max_delay=4, error=StatusError(429, {"retry-after": "30"})) == 30.0
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_breaker_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    breaker.record_failure()
+    time.sleep(0.25)
+    assert breaker.state == "half_open" and breaker.allow()
+    breaker.before_call()
+    assert not breaker.allow()
+    # a failed trial opens the breaker again
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.25)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_cancelled_trial_lets_another_one_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    assert not breaker.allow()
+    breaker.cancel_call()
+    assert breaker.allow()
@@ -0,0 +1,42 @@
+import pytest
+from junior.utils.routing import BalancedPolicy, ScoringPolicy, WindowPolicy, create_policy
+
+def candidate(name, window=8192, tokens=1000, price=None, expert_for=("everything",)):
+    return {
+        "name": name,
+        "config": {
+            "context_window_tokens": window,
+            "max_output_tokens": 1024,
+            "expert_for": list(expert_for),
+            "limits": {},
+            "price_per_million_tokens": price,
+        },
+        "tokens": tokens,
+        "category": "everything",
+        "headroom": {},
+        "ewma": {},
+    }
+
+def test_scoring_policy_is_abstract():
+    with pytest.raises(TypeError):
+        ScoringPolicy()
+
+def test_create_policy_defaults_to_balanced():
+    assert isinstance(create_policy({}), BalancedPolicy)
+    assert isinstance(create_policy({"ROUTING": {"policy": "window"}}), WindowPolicy)
+
+def test_create_policy_rejects_unknown_names():
+    with pytest.raises(ValueError, match="balanced, window"):
+        create_policy({"ROUTING": {"policy": "fastest"}})
+
+def test_window_policy_prefers_larger_windows():
+    ranked = WindowPolicy().rank([candidate("small", window=4096), candidate("large", window=100000)])
+    assert [item["name"] for item in ranked] == ["large", "small"]
+
+def test_balanced_policy_prefers_cheaper_models_when_deterministic():
+    policy = BalancedPolicy(deterministic=True)
+    ranked = policy.rank([
+        candidate("expensive", price={"input": 30, "output": 60}),
+        candidate("cheap", price={"input": 0.5, "output": 1.5}),
+    ])
+    assert ranked[0]["name"] == "cheap"
@@ -0,0 +1,81 @@
+import hashlib, json
+import pytest
+
+pytest.importorskip("docker")
+setup_mod = pytest.importorskip("junior.utils.setup")
+Setup = setup_mod.Setup
+DockerHelper = setup_mod.DockerHelper
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    for name in ("DOCKER_HOST", "DOCKER_CONTEXT", "DOCKER_CONFIG"):
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
+
+def test_docker_host_prefers_the_environment(home, monkeypatch):
+    monkeypatch.setenv("DOCKER_HOST", "unix:///run/user/1000/docker.sock")
+    assert DockerHelper.docker_host() == "unix:///run/user/1000/docker.sock"
+
+def test_docker_host_reads_the_active_context(home):
+    docker_dir = home / ".docker"
+    meta_dir = docker_dir / "contexts" / "meta" / hashlib.sha256(b"colima").hexdigest()
+    meta_dir.mkdir(parents=True)
+    (docker_dir / "config.json").write_text(json.dumps({"currentContext": "colima"}))
+    (meta_dir / "meta.json").write_text(json.dumps({"Name": "colima", "Endpoints": {"docker": {"Host": "unix:///home/me/.colima/docker.sock"}}}))
+    assert DockerHelper.docker_host() == "unix:///home/me/.colima/docker.sock"
+
+def test_docker_socket_state_follows_the_docker_host(home, monkeypatch):
+    socket_path = home / "docker.sock"
+    socket_path.write_text("")
+    monkeypatch.setenv("DOCKER_HOST", f"unix://{socket_path}")
+    setup = Setup()
+    assert setup.docker_socket_state()["inode"] == socket_path.stat().st_ino
+    monkeypatch.setenv("DOCKER_HOST", "tcp://10.0.0.2:2375")
+    assert setup.docker_socket_state() == {"host": "tcp://10.0.0.2:2375"}
+
+@pytest.fixture
+def checks(monkeypatch):
+    """Records check_llm_settings runs, as a fresh process would see them."""
+    monkeypatch.setattr(Setup, "llm_checked", False)
+    monkeypatch.setattr(Setup, "llm_ensured", False)
+    calls = []
+    monkeypatch.setattr(Setup, "check_llm_settings", lambda self: calls.append("check"))
+    return calls
+
+def test_ensure_llm_settings_checks_a_changed_setup_once_per_process(home, checks, monkeypatch):
+    monkeypatch.setattr(Setup, "is_warm", lambda self: False)
+    setup = Setup()
+    setup.settings = {"LLM": {"remote": {"OpenAI": "sk-test"}}}
+    setup.ensure_llm_settings()
+    Setup().ensure_llm_settings()
+    assert checks == ["check"]
+
+def test_ensure_llm_settings_skips_checks_on_a_warm_start(home, checks, monkeypatch):
+    monkeypatch.setattr(Setup, "is_warm", lambda self: True)
+    setup = Setup()
+    setup.settings = {"LLM": {"remote": {"OpenAI": "sk-test"}}}
+    setup.ensure_llm_settings()
+    assert checks == []
+
+class FakeOllama:
+    """Reports a few progress updates per model, several of them within the same percent."""
+    def pull(self, model, on_progress=None, attempts=3):
+        for completed in (0, 10, 11, 50, 100):
+            on_progress(completed, 100, "pulling layers")
+        on_progress(100, 100, "success")
+        return model != "broken"
+
+def test_pull_local_models_emits_events_per_model_in_json_lines_mode(home, capsys, monkeypatch):
+    monkeypatch.setattr(setup_mod.CLIManager, "output_format", "jsonl")
+    setup = Setup()
+    setup.settings = {}
+    capsys.readouterr()
+    results = setup.pull_local_models(FakeOllama(), {"ollama/llama3": "llama3", "ollama/broken": "broken"})
+    assert results == {"ollama/llama3": True, "ollama/broken": False}
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    llama3 = next(event["task"] for event in events if event["event"] == "task" and event["model"] == "ollama/llama3")
+    progress = [(event["completed"], event["message"]) for event in events if event["event"] == "progress" and event["task"] == llama3]
+    assert progress == [(0, "pulling layers"), (10, "pulling layers"), (11, "pulling layers"), (50, "pulling layers"), (100, "pulling layers"), (100, "success")]
+    done = {event["task"]: event["ok"] for event in events if event["event"] == "done"}
+    assert done[llama3] is True and sorted(done.values()) == [False, True]
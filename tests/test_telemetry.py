@@ -0,0 +1,69 @@
+import json, time
+import pytest
+from junior.utils.telemetry import Histogram, Telemetry
+
+def test_histogram_percentiles_within_bucket_error():
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(value)
+    assert histogram.count == 1000
+    assert histogram.percentile(50) == pytest.approx(500, rel=0.03)
+    assert histogram.percentile(90) == pytest.approx(900, rel=0.03)
+    assert histogram.percentile(99) == pytest.approx(990, rel=0.03)
+
+def test_histogram_clamps_to_observed_range():
+    histogram = Histogram()
+    histogram.record(100)
+    assert histogram.percentile(0) == 100
+    assert histogram.percentile(100) == 100
+
+def test_histogram_zeros_and_empty():
+    assert Histogram().percentile(50) is None
+    histogram = Histogram()
+    histogram.record(0)
+    histogram.record(0)
+    histogram.record(10)
+    assert histogram.percentile(50) == 0.0
+    assert histogram.percentile(100) == pytest.approx(10, rel=0.03)
+
+def test_histogram_export_roundtrip():
+    histogram = Histogram()
+    for value in (0, 1.5, 20, 300):
+        histogram.record(value)
+    restored = Histogram(histogram.export())
+    assert restored.summary() == histogram.summary()
+
+def test_ewma_starts_at_first_value_and_moves_by_alpha(tmp_path):
+    telemetry = Telemetry(storage_path=tmp_path / "telemetry.json")
+    assert telemetry.ewma("openai/gpt-4")["latency_s"] is None
+    telemetry.record("openai/gpt-4", latency=1.0, tokens_out=10)
+    assert telemetry.ewma("openai/gpt-4")["latency_s"] == 1.0
+    telemetry.record("openai/gpt-4", latency=2.0, tokens_out=10)
+    alpha = Telemetry.ewma_alpha
+    assert telemetry.ewma("openai/gpt-4")["latency_s"] == pytest.approx((1 - alpha) * 1.0 + alpha * 2.0)
+
+def test_errors_move_error_rate_but_not_latency(tmp_path):
+    telemetry = Telemetry(storage_path=tmp_path / "telemetry.json")
+    telemetry.record("groq/llama3-8b-8192", latency=1.0, tokens_out=10)
+    telemetry.record("groq/llama3-8b-8192", latency=30.0, error=True)
+    ewma = telemetry.ewma("groq/llama3-8b-8192")
+    assert ewma["latency_s"] == 1.0
+    assert ewma["error_rate"] == pytest.approx(Telemetry.ewma_alpha)
+
+def test_telemetry_persists(tmp_path):
+    path = tmp_path / "telemetry.json"
+    telemetry = Telemetry(storage_path=path)
+    telemetry.record("openai/gpt-4", latency=0.5, tokens_in=10, tokens_out=20)
+    assert not path.exists()  # buffered until the flush
+    telemetry.flush()
+    report = Telemetry(storage_path=path).report()["openai/gpt-4"]
+    assert report["requests"] == 1
+    assert report["latency_ms"]["count"] == 1
+
+def test_telemetry_flushes_on_a_timer(tmp_path):
+    path = tmp_path / "telemetry.json"
+    telemetry = Telemetry(storage_path=path, flush_interval=0.05)
+    telemetry.record_hedge("openai/gpt-4", won=True, wasted_tokens=30)
+    time.sleep(0.3)
+    assert json.loads(path.read_text())["models"]["openai/gpt-4"]["hedge_wasted_tokens"] == 30
+    assert not path.with_suffix(".tmp").exists()
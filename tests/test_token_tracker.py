@@ -0,0 +1,64 @@
+import time
+import pytest
+
+pytest.importorskip("cryptography")
+
+from junior.utils.token_tracker import TokenTracker, UsageWindow
+
+def test_usage_window_counts_within_span():
+    window = UsageWindow(60, 5)
+    window.add(tokens=100, now=1000)
+    window.add(tokens=50, now=1030)
+    assert window.totals(now=1030) == {"requests": 2, "tokens": 150}
+
+def test_usage_window_drops_expired_buckets():
+    window = UsageWindow(60, 5)
+    window.add(tokens=100, now=1000)
+    window.add(tokens=50, now=1055)
+    # the first bucket (1000..1005) fell out of the window
+    assert window.totals(now=1062) == {"requests": 1, "tokens": 50}
+    assert window.totals(now=2000) == {"requests": 0, "tokens": 0}
+
+def test_usage_window_pack_roundtrip():
+    window = UsageWindow(86400, 900)
+    window.add(tokens=10)
+    window.add(tokens=20)
+    restored = UsageWindow(86400, 900, packed=window.pack())
+    assert restored.totals() == {"requests": 2, "tokens": 30}
+
+def test_tracker_keeps_sequence_out_of_models(tmp_path):
+    path = tmp_path / "tracking.json"
+    tracker = TokenTracker(storage_path=path, flush_threshold=1)
+    tracker.update_model_usage("openai/gpt-4", tokens=42)
+    saved = tracker.storage.load()
+    assert set(saved) == {"models", "meta"}
+    assert list(saved["models"]) == ["openai/gpt-4"]
+    assert saved["meta"]["sequence"] == 1
+
+    reloaded = TokenTracker(storage_path=path)
+    assert reloaded.sequence == 1
+    assert reloaded.get_model_usage("openai/gpt-4")["tokens"] == 42
+    assert reloaded.get_window_usage("openai/gpt-4")["tokens_per_minute"] == 42
+
+def test_tracker_flushes_after_interval_without_new_updates(tmp_path):
+    path = tmp_path / "tracking.json"
+    tracker = TokenTracker(storage_path=path, flush_threshold=50, flush_interval=0.05)
+    tracker.update_model_usage("openai/gpt-4", tokens=7)
+    deadline = time.time() + 5
+    while tracker.pending and time.time() < deadline:
+        time.sleep(0.01)
+    assert tracker.pending == 0
+    assert tracker.storage.load()["models"]["openai/gpt-4"]["tokens"] == 7
+
+def test_reservations_count_against_limits_until_released(tmp_path):
+    tracker = TokenTracker(storage_path=tmp_path / "tracking.json")
+    limits = {"requests_per_minute": 2, "tokens_per_minute": 1000, "requests_per_day": None, "tokens_per_day": None}
+    tracker.reserve("openai/gpt-4", tokens=600)
+    assert tracker.remaining_headroom("openai/gpt-4", limits)["tokens_per_minute"] == 400
+    assert tracker.model_exceeds_limits("openai/gpt-4", limits, tokens=500)
+    tracker.reserve("openai/gpt-4", tokens=100)
+    assert tracker.model_exceeds_limits("openai/gpt-4", limits)
+    tracker.release("openai/gpt-4", tokens=600)
+    tracker.release("openai/gpt-4", tokens=100)
+    assert tracker.in_flight == {}
+    assert not tracker.model_exceeds_limits("openai/gpt-4", limits, tokens=500)
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+
+from junior.utils.tokenizer import Tokenizer
+
+class WordEncoder:
+    """Offline stand-in for a tiktoken encoding: one token per whitespace separated word."""
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, disallowed_special=()):
+        self.calls += 1
+        return text.split()
+
+@pytest.fixture
+def tokenizer():
+    tokenizer = Tokenizer(exact_margin=0.15)
+    tokenizer.encoders["cl100k_base"] = WordEncoder()
+    return tokenizer
+
+def test_fits_uses_estimate_far_from_budget(tokenizer):
+    text = "word " * 100  # estimated at 500 chars / 4 = 125 tokens
+    result = tokenizer.fits(text, "openai/gpt-4", budget=10000)
+    assert result == {"fits": True, "tokens": 125, "exact": False}
+    assert tokenizer.fits(text, "openai/gpt-4", budget=10)["fits"] is False
+    assert tokenizer.encoders["cl100k_base"].calls == 0
+
+def test_fits_counts_exactly_near_budget(tokenizer):
+    text = "word " * 100
+    result = tokenizer.fits(text, "openai/gpt-4", budget=130)
+    assert result == {"fits": True, "tokens": 100, "exact": True}
+
+def test_fits_applies_family_ratio(tokenizer):
+    text = "word " * 100
+    result = tokenizer.fits(text, "anthropic/claude-2", budget=130)
+    assert result["exact"] is True
+    assert result["tokens"] == 110  # 100 words * 1.1
+
+def test_fits_accepts_precomputed_estimate(tokenizer):
+    assert tokenizer.fits("anything", "openai/gpt-4", budget=1000, estimate=5000) == {"fits": False, "tokens": 5000, "exact": False}
+
+def test_counts_are_memoized(tokenizer):
+    tokenizer.count("a b c", "openai/gpt-4")
+    tokenizer.count("a b c", "openai/gpt-4")
+    assert tokenizer.encoders["cl100k_base"].calls == 1
+
+def test_fits_counts_non_ascii_text_exactly(tokenizer):
+    text = "日本語 " * 300  # 1200 chars would be estimated at 300 tokens
+    result = tokenizer.fits(text, "openai/gpt-4", budget=10000)
+    assert result == {"fits": True, "tokens": 300, "exact": True}
+    assert tokenizer.fits("🚀" * 4000, "openai/gpt-4", budget=2000)["exact"] is True
+
+def test_estimate_uses_bytes_for_non_ascii_text(tokenizer):
+    assert tokenizer.estimate("abcd" * 30, "openai/gpt-4") == 30
+    assert tokenizer.estimate("日本語" * 30, "openai/gpt-4") == 90  # 270 bytes / 3
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("deep_translator")
+pytest.importorskip("lingua")
+
+from junior.utils import translator as translator_module
+from junior.utils.translator import TranslationService
+
+class RecordingTranslator:
+    """Offline stand-in for the online translator: uppercases every line and records the requests."""
+    def __init__(self, drop_lines=False):
+        self.requests = []
+        self.drop_lines = drop_lines
+
+    def translate(self, text):
+        self.requests.append(text)
+        if self.drop_lines and "\n" in text:
+            return text.upper().split("\n")[0]
+        return text.upper()
+
+@pytest.fixture
+def service(tmp_path):
+    return TranslationService(cache_dir=tmp_path)
+
+def use(service, fake):
+    service.online_translator = lambda source_lang, target_lang: fake
+    return fake
+
+def test_batch_joins_texts_into_few_requests(service, monkeypatch):
+    monkeypatch.setattr(translator_module, "batch_max_chars", 100)
+    fake = use(service, RecordingTranslator())
+    texts = [f"message number {index}" for index in range(20)]  # 18-19 characters each
+    assert service.translate_batch(texts, target_lang="es") == [text.upper() for text in texts]
+    assert len(fake.requests) == 4
+    assert all(len(request) <= 100 for request in fake.requests)
+
+def test_batch_is_cached_and_deduplicated(service):
+    fake = use(service, RecordingTranslator())
+    service.translate_batch(["hello", "world", "hello"], target_lang="es")
+    assert fake.requests == ["hello\nworld"]
+    assert service.translate_batch(["world", "hello"], target_lang="es") == ["WORLD", "HELLO"]
+    assert len(fake.requests) == 1
+
+def test_batch_falls_back_to_one_request_per_text(service):
+    fake = use(service, RecordingTranslator(drop_lines=True))
+    assert service.translate_batch(["one", "two"], target_lang="es") == ["ONE", "TWO"]
+    assert fake.requests == ["one\ntwo", "one", "two"]
+
+def test_batch_same_language_is_returned_as_is(service):
+    fake = use(service, RecordingTranslator())
+    assert service.translate_batch(["hola"], target_lang="en", source_lang="en") == ["hola"]
+    assert fake.requests == []
+
+def test_languages_always_include_english(service):
+    service.set_languages(["es", "PT"])
+    assert service.languages == ("en", "es", "pt")
+    with pytest.raises(ValueError, match="xx"):
+        service.set_languages(["xx"])